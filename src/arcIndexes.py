@@ -0,0 +1,101 @@
+import argparse
+import json
+
+import numpy as np
+
+# Inverted indexes from players and countries to the arcs that mention them, so a
+# filter can fetch only the lines_{year}.json files (and arcs) it needs
+arc_indexes_path = './src/files/arc_indexes.json'
+
+
+def build_arc_indexes(table, arc_columns, year_range=(1950, 2025)):
+    """Player and country indexes over the aggregated arcs.
+
+    An arc's index is its position in the arcs of lines_{year}.json (and in
+    the year's packed or tiered arcs, which share the order). "players" maps
+    each player id to its [year, arc index] pairs in year order; "countries"
+    maps each country code to the arc indexes where it is the origin
+    ("outbound") or destination ("inbound"), per year.
+    """
+    first_year, last_year = year_range
+    year = arc_columns["year"].astype(np.int64)
+    _, year_first, year_row = np.unique(year, return_index=True, return_inverse=True)
+    arc_in_year = np.arange(len(year)) - year_first[year_row]
+    keep = (year >= first_year) & (year <= last_year)
+
+    # One (player, arc) row per arc member, grouped by player in arc order
+    player_offsets = arc_columns["player_offsets"]
+    member_arc = np.repeat(np.arange(len(year)), np.diff(player_offsets))
+    member_player = arc_columns["players"][:player_offsets[-1]].astype(np.int64)
+    member_keep = keep[member_arc]
+    member_arc, member_player = member_arc[member_keep], member_player[member_keep]
+    order = np.lexsort((member_arc, member_player))
+    member_arc, member_player = member_arc[order], member_player[order]
+    players, player_start = np.unique(member_player, return_index=True)
+    pairs = np.stack((year[member_arc], arc_in_year[member_arc]), axis=1).tolist()
+    player_end = np.append(player_start[1:], len(member_player)).tolist()
+    player_index = {table.player_ids[p]: pairs[start:end] for p, start, end in zip(players.tolist(), player_start.tolist(), player_end)}
+
+    country_index = {}
+    arcs = np.flatnonzero(keep)
+    for direction, column in (("outbound", "origin"), ("inbound", "destination")):
+        for arc, country in zip(arcs.tolist(), arc_columns[column][arcs].tolist()):
+            entry = country_index.setdefault(table.country_codes[country], {"years": [], "outbound": {}, "inbound": {}})
+            entry[direction].setdefault(str(year[arc]), []).append(int(arc_in_year[arc]))
+    for entry in country_index.values():
+        entry["years"] = sorted({int(y) for y in entry["outbound"]} | {int(y) for y in entry["inbound"]})
+
+    return {
+        "first_year": first_year,
+        "last_year": last_year,
+        "players": player_index,
+        "countries": dict(sorted(country_index.items()))
+    }
+
+
+def encode_arc_indexes(indexes):
+    return json.dumps(indexes, separators=(",", ":"))
+
+
+class ArcIndexes:
+    """Lookups over arc_indexes.json"""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    @classmethod
+    def load(cls, path=arc_indexes_path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def player_arcs(self, player_id):
+        """[(year, arc index)] of every arc listing the player"""
+        return [tuple(pair) for pair in self.indexes["players"].get(str(player_id), [])]
+
+    def country_years(self, country):
+        return self.indexes["countries"].get(country, {}).get("years", [])
+
+    def country_arcs(self, country, year, direction=None):
+        """Arc indexes of one year where the country is the origin ("outbound"), destination ("inbound") or either"""
+        entry = self.indexes["countries"].get(country)
+        if entry is None:
+            return []
+        directions = (direction,) if direction else ("outbound", "inbound")
+        return sorted(index for d in directions for index in entry[d].get(str(year), []))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up the arcs of a player or country.")
+    parser.add_argument("--player", help="Player id")
+    parser.add_argument("--country", help="Country code")
+    parser.add_argument("--year", type=int, help="Only this year (with --country)")
+    parser.add_argument("--path", default=arc_indexes_path, help="Arc index file")
+    args = parser.parse_args()
+
+    indexes = ArcIndexes.load(args.path)
+    if args.player:
+        for year, index in indexes.player_arcs(args.player):
+            print(f"{year}: arc {index}")
+    elif args.country:
+        for year in ([args.year] if args.year else indexes.country_years(args.country)):
+            print(f"{year}: arcs {indexes.country_arcs(args.country, year)}")
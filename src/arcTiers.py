@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+
+# Level-of-detail arc files: a light summary per year, the player lists in a
+# separate detail file, and optionally the year's busiest arcs on their own
+arc_tiers_folder_path = './src/files/arcs/tiers'
+
+SUMMARY_FIELDS = ("from", "to", "startLat", "startLong", "endLat", "endLong", "count")
+DETAIL_FIELDS = ("players", "player_ids")
+
+
+def tier_path(tier, year, folder_path=arc_tiers_folder_path):
+    return os.path.join(folder_path, f"{tier}_{year}.json")
+
+
+def encode_arc_tiers(year, arcs, color, scale, top=0, folder_path=arc_tiers_folder_path):
+    """{path: JSON-able data} of one year's tiers, from the arcs of lines_{year}.json.
+
+    summary_{year}.json lists every arc without its players; arc i of
+    detail_{year}.json holds the players of summary arc i. With top > 0,
+    top_{year}.json holds the top arcs by count (summary fields plus their
+    "index" in the summary), ties kept in summary order.
+    """
+    summary_arcs = [{field: arc[field] for field in SUMMARY_FIELDS} for arc in arcs]
+    files = {
+        tier_path("summary", year, folder_path): {
+            "type": "TransferSummary", "year": int(year), "color": color, "scale": scale, "arcs": summary_arcs
+        },
+        tier_path("detail", year, folder_path): {
+            "type": "TransferDetail", "year": int(year), "arcs": [{field: arc[field] for field in DETAIL_FIELDS} for arc in arcs]
+        }
+    }
+    if top > 0:
+        busiest = sorted(range(len(arcs)), key=lambda index: -arcs[index]["count"])[:top]
+        files[tier_path("top", year, folder_path)] = {
+            "type": "TransferSummary", "year": int(year), "color": color, "scale": scale,
+            "arcs": [{**summary_arcs[index], "index": index} for index in busiest]
+        }
+    return files
+
+
+def load_tier(tier, year, folder_path=arc_tiers_folder_path):
+    with open(tier_path(tier, year, folder_path), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_arc(year, index, folder_path=arc_tiers_folder_path):
+    """One arc with its players, shaped like an entry of lines_{year}.json"""
+    summary = load_tier("summary", year, folder_path)
+    detail = load_tier("detail", year, folder_path)
+    return {
+        "type": "transfer",
+        **{field: summary["arcs"][index][field] for field in SUMMARY_FIELDS[:-1]},
+        "color": summary["color"],
+        "scale": summary["scale"],
+        "count": summary["arcs"][index]["count"],
+        **detail["arcs"][index]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read the tiered arc files.")
+    parser.add_argument("year", help="Year to read")
+    parser.add_argument("--arc", type=int, help="Print one arc with its players")
+    parser.add_argument("--top", action="store_true", help="Print the top arcs of the year")
+    parser.add_argument("--folder", default=arc_tiers_folder_path)
+    args = parser.parse_args()
+
+    if args.arc is not None:
+        print(json.dumps(load_arc(args.year, args.arc, args.folder), indent=4, ensure_ascii=False))
+    else:
+        summary = load_tier("top" if args.top else "summary", args.year, args.folder)
+        for arc in summary["arcs"]:
+            print(f"{arc['from']} → {arc['to']}: {arc['count']}")
@@ -0,0 +1,167 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from createArcs import (arc_color, arc_scale, assign_display_names, build_parser, dedupe_player_transfers,
+                        ingest_transfer_files, list_transfer_files, load_country_info, write_outputs)
+from fetchTransfers import update_transfer_files
+from mockZerozero import MockZerozeroServer
+from pipelineStats import PipelineStats, peak_rss_mb
+from syntheticTransfers import DEFAULT_SIZES, generate_transfer_files, scaled_sizes
+from transferStream import iter_clubs, iter_transfer_records
+
+# Times and memory-profiles each createArcs stage on synthetic data at several scales
+DEFAULT_SCALES = (1, 10, 100)
+report_path = './benchmark_report.json'
+
+
+@contextlib.contextmanager
+def measure(stages, name, trace_memory=False):
+    """Record wall time, CPU time and memory of the enclosed block under stages[name].
+
+    Progress prints are swallowed. With trace_memory the peak of Python
+    allocations inside the block is reported (slower); the process peak RSS is
+    always reported.
+    """
+    if trace_memory:
+        tracemalloc.reset_peak()
+    wall, cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+    stages[name] = {
+        "wall_seconds": round(time.perf_counter() - wall, 4),
+        "cpu_seconds": round(time.process_time() - cpu, 4),
+        "peak_rss_mb": peak_rss_mb()
+    }
+    if trace_memory:
+        stages[name]["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+
+
+def benchmark_scale(scale, work_path, fetch_workers=4, trace_memory=False, seed=0, pipeline_args="", **sizes):
+    """Run every stage once on freshly generated data of the given scale.
+
+    The write stage runs createArcs.write_outputs with pipeline_args (createArcs
+    flags such as "--compress --arc-tiers") inside the scratch folder, so every
+    output file is covered and its sub-stages are reported as write/<stage>.
+    """
+    source_path = os.path.join(work_path, "source")
+    fetched_path = os.path.join(work_path, "transfers")
+    output_path = os.path.join(work_path, "output")
+    for path in (fetched_path, output_path):
+        os.makedirs(path, exist_ok=True)
+
+    start = time.perf_counter()
+    config = generate_transfer_files(source_path, seed=seed, **scaled_sizes(scale, **sizes))
+    generate_seconds = time.perf_counter() - start
+
+    payloads = {}
+    for filename, compet_id in config.items():
+        with open(os.path.join(source_path, filename), 'rb') as f:
+            payloads[str(compet_id)] = f.read()
+
+    stages = {}
+    with MockZerozeroServer(payloads) as server, measure(stages, "fetch", trace_memory):
+        update_transfer_files(fetched_path, config, workers=fetch_workers, base_url=server.base_url,
+                              manifest_path=os.path.join(work_path, "manifest.json"))
+
+    transfer_files = list_transfer_files(fetched_path)
+    country_info = load_country_info()
+
+    with measure(stages, "parse", trace_memory):
+        records = sum(1 for f in transfer_files for record in iter_transfer_records(iter_clubs(os.path.join(fetched_path, f)))
+                      if record.player is not None)
+
+    with measure(stages, "ingest_dedup", trace_memory):
+        ingest, _ = ingest_transfer_files(transfer_files, country_info, folder_path=fetched_path)
+        player_database, _ = ingest.build_player_database()
+        transfers_before = sum(len(player["transfers"]) for player in player_database.values())
+        dedupe_player_transfers(player_database)
+
+    with measure(stages, "display_names", trace_memory):
+        assign_display_names(player_database)
+
+    # The output paths are relative to the repository root: mirror its layout in the scratch folder
+    args = build_parser().parse_args(shlex.split(pipeline_args))
+    output_stats = PipelineStats()
+    os.makedirs(os.path.join(output_path, "src", "files", "arcs"), exist_ok=True)
+    with contextlib.chdir(output_path), measure(stages, "write", trace_memory):
+        write_outputs(args, player_database, country_info, stats=output_stats)
+    for name, stage in output_stats.report()["stages"].items():
+        stages[f"write/{name}"] = stage
+
+    return {
+        "scale": scale,
+        "competitions": len(config),
+        "input_bytes": sum(len(payload) for payload in payloads.values()),
+        "records": records,
+        "players": len(player_database),
+        "transfers_before_dedup": transfers_before,
+        "transfers": output_stats.counters.get("transfers", 0),
+        "arcs": output_stats.counters.get("arcs", 0),
+        "output_bytes": output_stats.counters.get("bytes_written", 0),
+        "generate_seconds": round(generate_seconds, 3),
+        "stages": stages
+    }
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, fetch_workers=4, trace_memory=False, seed=0, pipeline_args="", **sizes):
+    """Benchmark every scale in its own temporary folder and return the report"""
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "base_sizes": {**DEFAULT_SIZES, **sizes},
+        "arc_style": {"color": arc_color, "scale": arc_scale},
+        "pipeline_args": pipeline_args,
+        "results": []
+    }
+    if trace_memory:
+        tracemalloc.start()
+
+    for scale in scales:
+        work_path = tempfile.mkdtemp(prefix=f"bench_{scale}x_")
+        try:
+            result = benchmark_scale(scale, work_path, fetch_workers, trace_memory, seed, pipeline_args, **sizes)
+        finally:
+            shutil.rmtree(work_path, ignore_errors=True)
+        report["results"].append(result)
+
+        stage_summary = ", ".join(f"{name} {stage['wall_seconds']}s" for name, stage in result["stages"].items() if "/" not in name)
+        print(f"⏱️ {scale}x ({result['competitions']} competitions, {result['records']} records): {stage_summary}")
+
+    if trace_memory:
+        tracemalloc.stop()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark each createArcs stage on synthetic transfer data.")
+    parser.add_argument("--scales", type=float, nargs="+", default=list(DEFAULT_SCALES), help="Scale factors to run (multiply the competitions)")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="Concurrent downloads from the local stand-in")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the traced Python allocation peak of each stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=report_path, help="Where to write the JSON report")
+    parser.add_argument("--pipeline-args", default="", help="createArcs flags for the write stage, e.g. \"--compress --arc-tiers\"")
+    for name, default in DEFAULT_SIZES.items():
+        if name != "competitions":
+            parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=None)
+    args = parser.parse_args()
+
+    sizes = {name: getattr(args, name) for name in DEFAULT_SIZES if name != "competitions" and getattr(args, name) is not None}
+    scales = [int(scale) if float(scale).is_integer() else scale for scale in args.scales]
+    report = run_benchmarks(scales, args.fetch_workers, args.trace_memory, args.seed, args.pipeline_args, **sizes)
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark report written to {args.report}", file=sys.stderr)
@@ -0,0 +1,20 @@
+# Which country flags a player record carries, shared by every ingest path
+
+
+def player_country_flags(ranked_transfers, country_flags):
+    """{code: flag URL} for one player's transfers, given as (rank, from_country, to_country) in rank order.
+
+    country_flags maps each code to its lowest-ranked (rank, flag URL).
+    First come the flags already known when each transfer was read (flag
+    rank below the transfer's), then any other flag of its countries.
+    """
+    player_flags = {}
+    for rank, from_country, to_country in ranked_transfers:
+        for code in (from_country, to_country):
+            if code not in player_flags and code in country_flags and country_flags[code][0] < rank:
+                player_flags[code] = country_flags[code][1]
+    for rank, from_country, to_country in ranked_transfers:
+        for code in (from_country, to_country):
+            if code not in player_flags and code in country_flags:
+                player_flags[code] = country_flags[code][1]
+    return player_flags
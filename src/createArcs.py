@@ -1,80 +1,46 @@
+import argparse
+import hashlib
 import json
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import os
 import re
-import requests
-import hashlib
-
-# Download transfer files only if needed
-def hash_json(data):
-    """Create a hash of the JSON object (used to compare current vs new data)."""
-    return hashlib.md5(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
 
-print("\U0001F504 Checking for updates to transfer data...")
-
-transfers_folder_path = "./src/files/transfers"
-transfers_api_config = {
-    "transfers_ALE.json": 11,
-    "transfers_ARG.json": 70,
-    "transfers_ASA.json": 518,
-    "transfers_BEL.json": 15,
-    "transfers_BRA.json": 51,
-    "transfers_CHI.json": 117,
-    "transfers_ESP.json": 5,
-    "transfers_EUA.json": 25,
-    "transfers_FRA.json": 13,
-    "transfers_ING.json": 4,
-    "transfers_ITA.json": 10,
-    "transfers_MEX.json": 1485,
-    "transfers_PBA.json": 12,
-    "transfers_POR.json": 3,
-    "transfers_TUR.json": 24
-}
-
-api_base_url = "http://direct.zerozero.pt/api/v1/getGraphPlayersTransfersCountryCompet"
-app_key = "tY9Qv2xP"
-
-for filename, compet_id in transfers_api_config.items():
-    api_url = f"{api_base_url}/AppKey/{app_key}/competID/{compet_id}"
-    output_path = os.path.join(transfers_folder_path, filename)
-
-    try:
-        # Get new data from API
-        response = requests.get(api_url)
-        response.raise_for_status()
-        new_data = response.json()
-        new_hash = hash_json(new_data)
-
-        # Check if local file exists and is different
-        if os.path.exists(output_path):
-            with open(output_path, 'r', encoding='utf-8') as f:
-                try:
-                    existing_data = json.load(f)
-                    existing_hash = hash_json(existing_data)
-
-                    if existing_hash == new_hash:
-                        print(f"✅ {filename} is up-to-date.")
-                        continue  # Skip writing
-                except json.JSONDecodeError:
-                    print(f"⚠️ Corrupted JSON in {filename}, will overwrite.")
-
-        # Save new data
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(new_data, f, ensure_ascii=False, indent=2)
-
-        print(f"🔁 {filename} updated.")
-
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Failed to fetch {filename}: {e}")
-    except Exception as e:
-        print(f"❌ Unexpected error for {filename}: {e}")
-
-print("✔️ Transfer files update check complete.\n")
+from arcIndexes import arc_indexes_path, build_arc_indexes, encode_arc_indexes
+from arcTiers import arc_tiers_folder_path, encode_arc_tiers
+from countryFlags import player_country_flags
+from emitOutputs import Emitter, emit_file, emit_stream
+from fetchTransfers import DEFAULT_WORKERS, api_base_url, hash_file, update_transfer_files
+from transferStream import iter_clubs, iter_transfer_records
+from flowTables import build_flow_tables, encode_flow_tables, flow_tables_path
+from nameIndex import encode_name_index, index_filename as name_index_filename, name_index_files, name_index_folder_path
+from normalizeCache import DEFAULT_MAX_ENTRIES, NormalizeCache
+from packedArcs import encode_packed_arcs, packed_arcs_path
+from pipelineStats import PipelineStats
+from playerShards import (DEFAULT_SHARD_SIZE, SHARD_MODES, encode_player_shards, index_filename as player_index_filename, load_all_players,
+                          player_file_chunks, player_fragment, player_shards_folder_path, shard_filename, shard_index)
+from transferStore import TransferStore, reordered_players, transfer_store_path
+from transferTable import TransferTable, YearlyArcColumns, country_coordinates, intern
 
 # File paths configuration
+transfers_folder_path = "./src/files/transfers"
 map_file_path = './src/files/map.json'
 output_folder_path = './src/files/arcs'
 player_db_path = './src/files/players.json'
+build_state_path = './.cache/build_state.json'
+
+# Arc appearance shared by every generated arc
+arc_color = '#F76B15'
+arc_scale = 0.5
+
+# Years the front end can show (older and newer years are not written)
+year_range = (1950, 2025)
+
+# Year files the store path queues before writing them, so only a few years are held at once
+emit_batch_size = 64
+
+# Bump whenever the generated files change shape, so stale build states are ignored
+build_state_version = 6
 
 def extract_year(season_name):
     """Extract year from season name, using first year for season formats like '2017/2018'"""
@@ -86,13 +52,13 @@ def extract_year(season_name):
     match = re.search(r'\b(\d{4})\b', season_name)
     if match:
         return match.group(1)
-    
+
     # Check for short year format like "17/18"
     match = re.search(r'\b(\d{2})/?(\d{2})?\b', season_name)
     if match:
         year = match.group(1)
         return f"20{year}" if int(year) < 50 else f"19{year}"
-    
+
     # Check for mixed format like "2017/18"
     match = re.search(r'\b(\d{4})/?(\d{2})?\b', season_name)
     if match:
@@ -100,395 +66,854 @@ def extract_year(season_name):
 
     return None
 
-# Load country coordinates from map file
-with open(map_file_path, 'r', encoding='utf-8') as f:
-    map_data = json.load(f)
+def load_country_info(map_path=map_file_path):
+    """Load country coordinates from map file"""
+    with open(map_path, 'r', encoding='utf-8') as f:
+        map_data = json.load(f)
 
-country_info = {
-    entry["id"]: {
-        "code": entry["text"],
-        "lat": entry["lat"],
-        "lng": entry["lng"]
+    return {
+        entry["id"]: {
+            "code": entry["text"],
+            "lat": entry["lat"],
+            "lng": entry["lng"]
+        }
+        for entry in map_data["coordinates"]
     }
-    for entry in map_data["coordinates"]
-}
-
-# Dictionary to store country flag URLs
-country_flags = {}
-
-# Get all transfer JSON files
-transfer_files = [f for f in os.listdir(transfers_folder_path) if f.endswith('.json')]
 
-# Player database to store detailed player information
-player_database = {}
-
-# Track unique transfers to avoid duplicates
-transfer_key_set = set()
+def list_transfer_files(folder_path=transfers_folder_path):
+    """All competition files, in a stable order so first-seen data does not depend on the filesystem"""
+    return sorted(f for f in os.listdir(folder_path) if f.startswith('transfers_') and f.endswith('.json'))
+
+def track_seasons(clubs, season_index):
+    """Pass clubs through while recording each season's year and content hash in season_index"""
+    digests = {}
+    for season_name, club_index, club in clubs:
+        if season_name not in digests:
+            digests[season_name] = hashlib.md5()
+        digests[season_name].update(json.dumps(club, sort_keys=True).encode('utf-8'))
+        yield season_name, club_index, club
+
+    for season_name, digest in digests.items():
+        season_index[season_name] = {"year": extract_year(season_name), "md5": digest.hexdigest()}
+
+# Bits per interned code in a packed transfer key
+KEY_BITS = 32
+
+def pack_transfer_key(player, year, from_country, to_country, from_club, to_club):
+    """One integer standing for a transfer's (player, year, countries, clubs) codes"""
+    key = player
+    for code in (year, from_country, to_country, from_club, to_club):
+        key = key << KEY_BITS | code
+    return key
+
+class TransferRow:
+    """One transfer, with every string replaced by its code in TransferIngest.strings"""
+    __slots__ = ("rank", "player", "year", "from_country", "to_country", "from_club", "to_club", "from_club_name", "to_club_name")
+
+    def __init__(self, rank, player, year, from_country, to_country, from_club, to_club, from_club_name, to_club_name):
+        self.rank = rank
+        self.player = player
+        self.year = year
+        self.from_country = from_country
+        self.to_country = to_country
+        self.from_club = from_club
+        self.to_club = to_club
+        self.from_club_name = from_club_name
+        self.to_club_name = to_club_name
+
+    def key(self):
+        return pack_transfer_key(self.player, self.year, self.from_country, self.to_country, self.from_club, self.to_club)
+
+    def codes(self):
+        return (self.player, self.year, self.from_country, self.to_country, self.from_club, self.to_club, self.from_club_name, self.to_club_name)
+
+    def transfer(self, values):
+        """The transfer as written to players.json"""
+        return {
+            "year": values[self.year],
+            "from_country": values[self.from_country],
+            "to_country": values[self.to_country],
+            "from_club_id": values[self.from_club],
+            "from_club_name": values[self.from_club_name],
+            "to_club_id": values[self.to_club],
+            "to_club_name": values[self.to_club_name]
+        }
 
-# Process each transfer file
-for transfer_file in transfer_files:
-    transfer_file_path = os.path.join(transfers_folder_path, transfer_file)
-    print(f"Processing file: {transfer_file}")
-    
+class TransferIngest:
+    """Accumulates the transfers of any number of competition files.
+
+    Every record carries a rank: the index of its file followed by its
+    position in that file's sorted seasons. Whenever two records compete for
+    the same player, transfer key or country flag the lowest rank wins, so the
+    result does not depend on the order records arrive in.
+
+    Player ids, years, countries, clubs and names are interned once in
+    strings; rows and keys only hold their integer codes.
+    """
+
+    def __init__(self):
+        # string -> code (codes follow insertion order)
+        self.strings = {}
+        # player code -> (rank, name code, position code, birth date code)
+        self.players = {}
+        # packed transfer key -> TransferRow
+        self.transfer_keys = {}
+        # country code -> (rank, flag URL), shared by every player
+        self.country_flags = {}
+        # Player records read and transfers offered to add_transfer, for the run report
+        self.records_parsed = 0
+        self.transfers_seen = 0
+
+    def add_flag(self, code, logo_url, rank):
+        if code not in self.country_flags or rank < self.country_flags[code][0]:
+            self.country_flags[code] = (rank, logo_url)
+
+    def add_transfer(self, player_id, player, year, from_country, to_country,
+                     from_club_id, from_club_name, to_club_id, to_club_name, rank):
+        """Record one transfer for a player, skipping exact duplicates"""
+        self.transfers_seen += 1
+        strings = self.strings
+        code = strings.setdefault
+        player_code, year_code = code(player_id, len(strings)), code(year, len(strings))
+        from_code, to_code = code(from_country, len(strings)), code(to_country, len(strings))
+        from_club_code, to_club_code = code(from_club_id, len(strings)), code(to_club_id, len(strings))
+
+        # Skip if already processed
+        transfer_key = pack_transfer_key(player_code, year_code, from_code, to_code, from_club_code, to_club_code)
+        existing = self.transfer_keys.get(transfer_key)
+        if existing is not None and existing.rank <= rank:
+            return
+        self.transfer_keys[transfer_key] = TransferRow(rank, player_code, year_code, from_code, to_code, from_club_code, to_club_code,
+                                                       code(from_club_name, len(strings)), code(to_club_name, len(strings)))
+
+        # Add player to database if not already there
+        if player_code not in self.players or rank < self.players[player_code][0]:
+            self.players[player_code] = (rank, code(player["name"], len(strings)), code(player.get("posicao", "Unknown"), len(strings)),
+                                         code(player.get("dt_nascimento", "Unknown"), len(strings)))
+
+    @property
+    def duplicates_skipped(self):
+        """Transfers dropped because their exact key was already recorded"""
+        return self.transfers_seen - len(self.transfer_keys)
+
+    def merge(self, other):
+        """Fold in the records of another ingest (e.g. one built by a worker process)"""
+        self.records_parsed += other.records_parsed
+        self.transfers_seen += other.transfers_seen
+        for code, (rank, logo_url) in other.country_flags.items():
+            self.add_flag(code, logo_url, rank)
+
+        # Codes differ between ingests: translate the other's into ours
+        remap = [intern(self.strings, value) for value in other.strings]
+        for other_row in other.transfer_keys.values():
+            row = TransferRow(other_row.rank, *(remap[code] for code in other_row.codes()))
+            transfer_key = row.key()
+            existing = self.transfer_keys.get(transfer_key)
+            if existing is None or row.rank < existing.rank:
+                self.transfer_keys[transfer_key] = row
+        for player, (rank, *info) in other.players.items():
+            player = remap[player]
+            if player not in self.players or rank < self.players[player][0]:
+                self.players[player] = (rank, *(remap[code] for code in info))
+
+    def state(self):
+        """Plain-data copy of the records, for the normalization cache"""
+        return (list(self.strings), self.players, [(row.rank,) + row.codes() for row in self.transfer_keys.values()],
+                self.country_flags, self.records_parsed, self.transfers_seen)
+
+    @classmethod
+    def from_state(cls, state, file_index):
+        """Rebuild the ingest of a single file from state(), ranked as file number file_index"""
+        ingest = cls()
+        strings, players, rows, country_flags, ingest.records_parsed, ingest.transfers_seen = state
+        ingest.strings = {value: code for code, value in enumerate(strings)}
+        ingest.players = {player: ((file_index,) + rank[1:], *info) for player, (rank, *info) in players.items()}
+        for rank, *codes in rows:
+            row = TransferRow((file_index,) + rank[1:], *codes)
+            ingest.transfer_keys[row.key()] = row
+        ingest.country_flags = {k: ((file_index,) + rank[1:], v) for k, (rank, v) in country_flags.items()}
+        return ingest
+
+    def build_player_database(self):
+        """Player database and country flags, as if every record had been processed in rank order"""
+        values = list(self.strings)
+        player_rows = defaultdict(list)
+        for row in self.transfer_keys.values():
+            player_rows[row.player].append(row)
+
+        country_flags = {code: logo_url for code, (rank, logo_url) in sorted(self.country_flags.items(), key=lambda item: item[1][0])}
+
+        player_database = {}
+        for player, (rank, name, position, birth_date) in sorted(self.players.items(), key=lambda item: item[1][0]):
+            rows = sorted(player_rows[player], key=lambda row: row.rank)
+
+            player_flags = player_country_flags([(row.rank, values[row.from_country], values[row.to_country]) for row in rows],
+                                                self.country_flags)
+
+            player_id = values[player]
+            player_database[player_id] = {
+                "id": player_id,
+                "name": values[name],
+                "position": values[position],
+                "birthDate": values[birth_date],
+                "transfers": [row.transfer(values) for row in rows],
+                "country_flags": player_flags
+            }
+        return player_database, country_flags
+
+def process_transfer_file(transfer_file_path, file_index, country_info, ingest, season_index=None, verbose=True):
+    """Stream every transfer of one competition file into ingest.
+
+    When season_index is given it is filled with the file's seasons as
+    {season_name: {"year": ..., "md5": ...}}. verbose=False keeps the
+    per-season progress lines quiet (used by worker processes).
+    """
     # Extract destination country code from filename
-    destination_country_code = transfer_file.split("_")[-1].split(".")[0]
-
-    with open(transfer_file_path, 'r', encoding='utf-8') as f:
-        transfers_data = json.load(f)
+    destination_country_code = os.path.basename(transfer_file_path).split("_")[-1].split(".")[0]
+
+    clubs = iter_clubs(transfer_file_path)
+    if season_index is not None:
+        clubs = track_seasons(clubs, season_index)
+
+    season_name, year = None, None
+    for record in iter_transfer_records(clubs):
+        if record.player is not None:
+            ingest.records_parsed += 1
+        if record.season != season_name:
+            season_name = record.season
+            if verbose:
+                print(f"Processing season: {season_name}")
+            year = extract_year(season_name)
+            if not year:
+                print(f"Warning: Could not extract year from season name: {season_name}")
+        if not year:
+            continue
 
-    seasons = transfers_data["data"]["seasons"]
-    sorted_seasons = sorted(seasons.items(), key=lambda x: x[0])
+        country_id = record.country_id
+        if not country_id or int(country_id) == 0 or int(country_id) not in country_info:
+            continue
+        other_country_code = country_info[int(country_id)]["code"]
+        rank = (file_index,) + record.rank
 
-    # Process each season
-    for season_name, clubs in sorted_seasons:
-        print(f"Processing season: {season_name}")
-        year = extract_year(season_name)
-        if not year:
-            print(f"Warning: Could not extract year from season name: {season_name}")
+        # Store flag URL if available
+        if record.player is None:
+            if "logo" in record.country and record.country["logo"] and other_country_code:
+                ingest.add_flag(other_country_code, record.country["logo"], rank)
             continue
 
-        # Process each club
-        for club in clubs:
-            current_club_id = club.get("id")
-            current_club_name = club.get("name")
-            
-            transfers_in = club.get("teams_in", {})
-            transfers_out = club.get("teams_out", {})
-
-            # Process incoming transfers
-            if isinstance(transfers_in, dict):
-                for country_id, transfer_info in transfers_in.items():
-                    if not country_id or int(country_id) == 0:
-                        continue
-                    if int(country_id) in country_info:
-                        origin_country_code = country_info[int(country_id)]["code"]
-                        
-                        # Store flag URL if available
-                        if "logo" in transfer_info and transfer_info["logo"]:
-                            logo_url = transfer_info["logo"]
-                            if origin_country_code and origin_country_code not in country_flags:
-                                country_flags[origin_country_code] = logo_url
-                        
-                        if "players" in transfer_info:
-                            players = transfer_info["players"]
-                            # Handle players as dictionary
-                            if isinstance(players, dict):
-                                for player_id, player in players.items():
-                                    # Create unique key for this transfer
-                                    transfer_key = (
-                                        player_id, 
-                                        year, 
-                                        origin_country_code, 
-                                        destination_country_code,
-                                        player.get("club_id"),
-                                        current_club_id
-                                    )
-                                    
-                                    # Skip if already processed
-                                    if transfer_key in transfer_key_set:
-                                        continue
-                                    
-                                    transfer_key_set.add(transfer_key)
-                                    
-                                    # Add player to database if not already there
-                                    if player_id not in player_database:
-                                        player_database[player_id] = {
-                                            "id": player_id,
-                                            "name": player["name"],
-                                            "position": player.get("posicao", "Unknown"),
-                                            "birthDate": player.get("dt_nascimento", "Unknown"),
-                                            "transfers": [],
-                                            "country_flags": {}
-                                        }
-                                    
-                                    # Add transfer to player's history
-                                    player_database[player_id]["transfers"].append({
-                                        "year": year,
-                                        "from_country": origin_country_code,
-                                        "to_country": destination_country_code,
-                                        "from_club_id": player.get("club_id"),
-                                        "from_club_name": player.get("club_descr"),
-                                        "to_club_id": current_club_id,
-                                        "to_club_name": current_club_name
-                                    })
-                                    
-                                    # Store country flags for this player
-                                    if origin_country_code not in player_database[player_id]["country_flags"] and origin_country_code in country_flags:
-                                        player_database[player_id]["country_flags"][origin_country_code] = country_flags[origin_country_code]
-                                    
-                                    if destination_country_code not in player_database[player_id]["country_flags"] and destination_country_code in country_flags:
-                                        player_database[player_id]["country_flags"][destination_country_code] = country_flags[destination_country_code]
-                            # Handle players as list
-                            elif isinstance(players, list):
-                                for player in players:
-                                    if "name" in player and "id" in player:
-                                        player_id = player["id"]
-                                        transfer_key = (
-                                            player_id, 
-                                            year, 
-                                            origin_country_code, 
-                                            destination_country_code,
-                                            player.get("club_id"),
-                                            current_club_id
-                                        )
-                                        
-                                        if transfer_key in transfer_key_set:
-                                            continue
-                                        
-                                        transfer_key_set.add(transfer_key)
-                                        
-                                        if player_id not in player_database:
-                                            player_database[player_id] = {
-                                                "id": player_id,
-                                                "name": player["name"],
-                                                "position": player.get("posicao", "Unknown"),
-                                                "birthDate": player.get("dt_nascimento", "Unknown"),
-                                                "transfers": [],
-                                                "country_flags": {}
-                                            }
-                                        
-                                        player_database[player_id]["transfers"].append({
-                                            "year": year,
-                                            "from_country": origin_country_code,
-                                            "to_country": destination_country_code,
-                                            "from_club_id": player.get("club_id"),
-                                            "from_club_name": player.get("club_descr"),
-                                            "to_club_id": current_club_id,
-                                            "to_club_name": current_club_name
-                                        })
-                                        
-                                        if origin_country_code not in player_database[player_id]["country_flags"] and origin_country_code in country_flags:
-                                            player_database[player_id]["country_flags"][origin_country_code] = country_flags[origin_country_code]
-                                        
-                                        if destination_country_code not in player_database[player_id]["country_flags"] and destination_country_code in country_flags:
-                                            player_database[player_id]["country_flags"][destination_country_code] = country_flags[destination_country_code]
-
-            # Process outgoing transfers
-            if isinstance(transfers_out, dict):
-                for country_id, transfer_info in transfers_out.items():
-                    if not country_id or int(country_id) == 0:
-                        continue
-                    if int(country_id) in country_info:
-                        destination_country_code_out = country_info[int(country_id)]["code"]
-                        
-                        if "logo" in transfer_info and transfer_info["logo"]:
-                            logo_url = transfer_info["logo"]
-                            if destination_country_code_out and destination_country_code_out not in country_flags:
-                                country_flags[destination_country_code_out] = logo_url
-                        
-                        if "players" in transfer_info:
-                            players = transfer_info["players"]
-                            if isinstance(players, dict):
-                                for player_id, player in players.items():
-                                    transfer_key = (
-                                        player_id, 
-                                        year, 
-                                        destination_country_code, 
-                                        destination_country_code_out,
-                                        current_club_id,
-                                        player.get("club_id")
-                                    )
-                                    
-                                    if transfer_key in transfer_key_set:
-                                        continue
-                                    
-                                    transfer_key_set.add(transfer_key)
-                                    
-                                    if player_id not in player_database:
-                                        player_database[player_id] = {
-                                            "id": player_id,
-                                            "name": player["name"],
-                                            "position": player.get("posicao", "Unknown"),
-                                            "birthDate": player.get("dt_nascimento", "Unknown"),
-                                            "transfers": [],
-                                            "country_flags": {}
-                                        }
-                                    
-                                    player_database[player_id]["transfers"].append({
-                                        "year": year,
-                                        "from_country": destination_country_code,
-                                        "to_country": destination_country_code_out,
-                                        "from_club_id": current_club_id,
-                                        "from_club_name": current_club_name,
-                                        "to_club_id": player.get("club_id"),
-                                        "to_club_name": player.get("club_descr")
-                                    })
-                                    
-                                    if destination_country_code not in player_database[player_id]["country_flags"] and destination_country_code in country_flags:
-                                        player_database[player_id]["country_flags"][destination_country_code] = country_flags[destination_country_code]
-                                    
-                                    if destination_country_code_out not in player_database[player_id]["country_flags"] and destination_country_code_out in country_flags:
-                                        player_database[player_id]["country_flags"][destination_country_code_out] = country_flags[destination_country_code_out]
-                            elif isinstance(players, list):
-                                for player in players:
-                                    if "name" in player and "id" in player:
-                                        player_id = player["id"]
-                                        transfer_key = (
-                                            player_id, 
-                                            year, 
-                                            destination_country_code, 
-                                            destination_country_code_out,
-                                            current_club_id,
-                                            player.get("club_id")
-                                        )
-                                        
-                                        if transfer_key in transfer_key_set:
-                                            continue
-                                        
-                                        transfer_key_set.add(transfer_key)
-                                        
-                                        if player_id not in player_database:
-                                            player_database[player_id] = {
-                                                "id": player_id,
-                                                "name": player["name"],
-                                                "position": player.get("posicao", "Unknown"),
-                                                "birthDate": player.get("dt_nascimento", "Unknown"),
-                                                "transfers": [],
-                                                "country_flags": {}
-                                            }
-                                        
-                                        player_database[player_id]["transfers"].append({
-                                            "year": year,
-                                            "from_country": destination_country_code,
-                                            "to_country": destination_country_code_out,
-                                            "from_club_id": current_club_id,
-                                            "from_club_name": current_club_name,
-                                            "to_club_id": player.get("club_id"),
-                                            "to_club_name": player.get("club_descr")
-                                        })
-                                        
-                                        if destination_country_code not in player_database[player_id]["country_flags"] and destination_country_code in country_flags:
-                                            player_database[player_id]["country_flags"][destination_country_code] = country_flags[destination_country_code]
-                                        
-                                        if destination_country_code_out not in player_database[player_id]["country_flags"] and destination_country_code_out in country_flags:
-                                            player_database[player_id]["country_flags"][destination_country_code_out] = country_flags[destination_country_code_out]
-
-for player_id, player_data in player_database.items():
-    for transfer in player_data["transfers"]:
-        for code in [transfer["from_country"], transfer["to_country"]]:
-            if code not in player_data["country_flags"] and code in country_flags:
-                player_data["country_flags"][code] = country_flags[code]
-
-# Deduplicate transfers for each player
-for player_id, player_data in player_database.items():
-    if "transfers" in player_data:
-        unique_transfers = {}
-        
-        for transfer in player_data["transfers"]:
-            # Create key that ignores year but includes all other relevant data
-            transfer_key = (
-                transfer["from_country"],
-                transfer["to_country"],
-                transfer.get("from_club_id", ""),
-                transfer.get("to_club_id", "")
-            )
-            
-            # Check for consecutive year duplicates
-            if transfer_key in unique_transfers:
-                existing_transfer = unique_transfers[transfer_key]
-                year_diff = abs(int(existing_transfer["year"]) - int(transfer["year"]))
-                
-                # If years are consecutive (difference of 1), keep the earlier year
-                if year_diff <= 1:
-                    if int(transfer["year"]) < int(existing_transfer["year"]):
-                        unique_transfers[transfer_key] = transfer
+        # Incoming transfers come from the listed country, outgoing ones go to it
+        player = record.player
+        current_club_id = record.club.get("id")
+        current_club_name = record.club.get("name")
+        if record.direction == "teams_in":
+            ingest.add_transfer(record.player_id, player, year, other_country_code, destination_country_code,
+                                player.get("club_id"), player.get("club_descr"), current_club_id, current_club_name, rank)
+        else:
+            ingest.add_transfer(record.player_id, player, year, destination_country_code, other_country_code,
+                                current_club_id, current_club_name, player.get("club_id"), player.get("club_descr"), rank)
+
+def ingest_transfer_file(transfer_file_path, file_index, country_info, tracked):
+    """Worker entry point: ingest a single file on its own. Returns (ingest, season_index or None)"""
+    print(f"Processing file: {os.path.basename(transfer_file_path)}", flush=True)
+    ingest = TransferIngest()
+    season_index = {} if tracked else None
+    process_transfer_file(transfer_file_path, file_index, country_info, ingest, season_index, verbose=False)
+    return ingest, season_index
+
+def ingest_transfer_files(transfer_files, country_info, tracked_files=(), workers=1, folder_path=transfers_folder_path,
+                          cache=None, file_hashes=None):
+    """Ingest every competition file, serially or one file per worker process.
+
+    Partial results are merged by rank, so the outcome is the same for any
+    worker count or completion order. Returns (ingest, {filename: season_index})
+    with a season index only for the files in tracked_files.
+
+    With a NormalizeCache (and the files' md5s in file_hashes) files seen
+    before are loaded from the cache instead of being parsed again, and new
+    ones are added to it.
+    """
+    file_paths = [os.path.join(folder_path, f) for f in transfer_files]
+    file_indexes = range(len(transfer_files))
+    track = [f in tracked_files for f in transfer_files]
+    season_indexes = {}
+    ingest = TransferIngest()
+
+    # Files already normalized under the same content hash
+    pending = []
+    for transfer_file, file_path, file_index, tracked in zip(transfer_files, file_paths, file_indexes, track):
+        cached = cache.load(cache.key(transfer_file, file_hashes[transfer_file])) if cache is not None else None
+        if cached is None:
+            pending.append((transfer_file, file_path, file_index, tracked or cache is not None))
+            continue
+        print(f"♻️ Loaded file from cache: {transfer_file}")
+        state, season_index = cached
+        ingest.merge(TransferIngest.from_state(state, file_index))
+        season_indexes[transfer_file] = season_index if tracked else None
+
+    def add_partial(transfer_file, partial, season_index):
+        if cache is not None:
+            cache.store(cache.key(transfer_file, file_hashes[transfer_file]), (partial.state(), season_index))
+        if partial is not ingest:
+            ingest.merge(partial)
+        season_indexes[transfer_file] = season_index if transfer_file in tracked_files else None
+
+    if workers > 1 and pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            names, paths, indexes, tracking = zip(*pending)
+            partials = pool.map(ingest_transfer_file, paths, indexes, [country_info] * len(pending), tracking)
+            for transfer_file, file_index, (partial, season_index) in zip(names, indexes, partials):
+                add_partial(transfer_file, partial, season_index)
+    else:
+        for transfer_file, file_path, file_index, tracked in pending:
+            print(f"Processing file: {transfer_file}")
+            # Without a cache every file goes straight into the shared ingest
+            partial = TransferIngest() if cache is not None else ingest
+            season_index = {} if tracked else None
+            process_transfer_file(file_path, file_index, country_info, partial, season_index)
+            add_partial(transfer_file, partial, season_index)
+
+    if cache is not None:
+        cache.evict()
+    return ingest, {f: season_indexes[f] for f in transfer_files}
+
+def sync_transfer_store(store, transfer_files, file_hashes, country_info, tracked_files=(), folder_path=transfers_folder_path):
+    """Bring a TransferStore up to date with the competition files.
+
+    Files whose md5 the store already holds are not parsed again (unless
+    their season index is wanted in tracked_files); files that disappeared
+    are dropped. Returns (records parsed, {filename: season_index}).
+    """
+    stored_hashes = store.file_hashes()
+    store.remove_files(set(transfer_files))
+    records_parsed = 0
+    season_indexes = {}
+    for file_index, transfer_file in enumerate(transfer_files):
+        season_indexes[transfer_file] = None
+        if stored_hashes.get(transfer_file) == file_hashes[transfer_file] and transfer_file not in tracked_files:
+            continue
+        print(f"Processing file: {transfer_file}")
+        ingest = store.begin_file(transfer_file)
+        season_index = {} if transfer_file in tracked_files else None
+        process_transfer_file(os.path.join(folder_path, transfer_file), file_index, country_info, ingest, season_index)
+        store.finish_file(ingest, file_hashes[transfer_file])
+        records_parsed += ingest.records_parsed
+        season_indexes[transfer_file] = season_index
+    return records_parsed, season_indexes
+
+def dedupe_player_transfers(player_database):
+    """Deduplicate transfers for each player. Returns how many consecutive-year duplicates were merged"""
+    merged = 0
+    for player_id, player_data in player_database.items():
+        if "transfers" in player_data:
+            unique_transfers = {}
+
+            for transfer in player_data["transfers"]:
+                # Create key that ignores year but includes all other relevant data
+                transfer_key = (
+                    transfer["from_country"],
+                    transfer["to_country"],
+                    transfer.get("from_club_id", ""),
+                    transfer.get("to_club_id", "")
+                )
+
+                # Check for consecutive year duplicates
+                if transfer_key in unique_transfers:
+                    existing_transfer = unique_transfers[transfer_key]
+                    year_diff = abs(int(existing_transfer["year"]) - int(transfer["year"]))
+
+                    # If years are consecutive (difference of 1), keep the earlier year
+                    if year_diff <= 1:
+                        merged += 1
+                        if int(transfer["year"]) < int(existing_transfer["year"]):
+                            unique_transfers[transfer_key] = transfer
+                    else:
+                        # If years are not consecutive, treat as separate transfer
+                        new_key = transfer_key + (transfer["year"],)
+                        unique_transfers[new_key] = transfer
+                else:
+                    unique_transfers[transfer_key] = transfer
+
+            # Replace original transfers with deduplicated ones
+            player_data["transfers"] = list(unique_transfers.values())
+    return merged
+
+def assign_display_names(player_database):
+    """Handle players with the same name by adding birth year or index. Returns the number of shared names"""
+    player_name_map = defaultdict(list)
+    for player_id, player_data in player_database.items():
+        player_name_map[player_data["name"]].append(player_id)
+
+    collisions = 0
+    for name, ids in player_name_map.items():
+        if len(ids) > 1:
+            collisions += 1
+            print(f"Found {len(ids)} players with name '{name}'")
+            for i, player_id in enumerate(ids):
+                player = player_database[player_id]
+                birth_date = player.get("birthDate", "Unknown")
+
+                if birth_date != "Unknown" and len(birth_date) >= 4:
+                    try:
+                        birth_year = birth_date[:4]
+                        player["display_name"] = f"{name} ({birth_year})"
+                    except:
+                        player["display_name"] = f"{name} ({i+1})"
                 else:
-                    # If years are not consecutive, treat as separate transfer
-                    new_key = transfer_key + (transfer["year"],)
-                    unique_transfers[new_key] = transfer
-            else:
-                unique_transfers[transfer_key] = transfer
-        
-        # Replace original transfers with deduplicated ones
-        player_data["transfers"] = list(unique_transfers.values())
-
-# Handle players with the same name by adding birth year or index
-player_name_map = defaultdict(list)
-for player_id, player_data in player_database.items():
-    player_name_map[player_data["name"]].append(player_id)
-
-for name, ids in player_name_map.items():
-    if len(ids) > 1:
-        print(f"Found {len(ids)} players with name '{name}'")
-        for i, player_id in enumerate(ids):
-            player = player_database[player_id]
-            birth_date = player.get("birthDate", "Unknown")
-            
-            if birth_date != "Unknown" and len(birth_date) >= 4:
-                try:
-                    birth_year = birth_date[:4]
-                    player["display_name"] = f"{name} ({birth_year})"
-                except:
                     player["display_name"] = f"{name} ({i+1})"
-            else:
-                player["display_name"] = f"{name} ({i+1})"
-    else:
-        player_database[ids[0]]["display_name"] = name
-
-# Write player database to file
-with open(player_db_path, 'w', encoding='utf-8') as f:
-    json.dump({"players": player_database}, f, indent=4)
-
-print(f"✅ Player database successfully generated with {len(player_database)} players!")
-
-# Generate arcs based on the deduplicated player database
-yearly_transfer_data = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {'count': 0, 'players': set(), 'player_ids': set()})))
-
-# Rebuild transfer data from player database
-for player_id, player_data in player_database.items():
-    for transfer in player_data["transfers"]:
-        year = transfer["year"]
-        from_country = transfer["from_country"]
-        to_country = transfer["to_country"]
-        
-        yearly_transfer_data[year][from_country][to_country]['players'].add(player_data["display_name"])
-        yearly_transfer_data[year][from_country][to_country]['player_ids'].add(player_id)
-        yearly_transfer_data[year][from_country][to_country]['count'] += 1
-
-# Generate arc files for each year
-for year, origin_data in yearly_transfer_data.items():
-    arcs = []
-    for origin_code, destination_data in origin_data.items():
-        for destination_code, data in destination_data.items():
-            player_count = len(data['players'])
-            count = player_count if player_count > 0 else data['count']
-            players = list(data['players'])
-            
-            if origin_code in {info["code"] for info in country_info.values()} and destination_code in {info["code"] for info in country_info.values()}:
-                origin_id = next((id for id, info in country_info.items() if info["code"] == origin_code), None)
-                destination_id = next((id for id, info in country_info.items() if info["code"] == destination_code), None)
-
-                if origin_id and destination_id:
-                    start_lat = country_info[origin_id]["lat"]
-                    start_long = country_info[origin_id]["lng"]
-                    end_lat = country_info[destination_id]["lat"]
-                    end_long = country_info[destination_id]["lng"]
-
-                    arcs.append({
-                        "type": "transfer",
-                        "from": origin_code,
-                        "to": destination_code,
-                        "startLat": start_lat,
-                        "startLong": start_long,
-                        "endLat": end_lat,
-                        "endLong": end_long,
-                        "color": '#F76B15',
-                        "scale": 0.5,
-                        "count": count,
-                        "players": players,
-                        "player_ids": list(data['player_ids'])
-                    })
-    
-    # Write arcs for this year if within valid range
-    if 1950 <= int(year) <= 2025:
-        lines_data = {
+        else:
+            player_database[ids[0]]["display_name"] = name
+    return collisions
+
+def build_yearly_arcs(table, arc_columns, coordinates):
+    """Expand the aggregated arc columns into the per-year arc dicts of the JSON files"""
+    lat, lng, _ = coordinates
+    codes = table.country_codes
+    player_offsets, name_offsets = arc_columns["player_offsets"], arc_columns["name_offsets"]
+    yearly_arcs = defaultdict(list)
+    for i, (year, origin, destination, count) in enumerate(zip(arc_columns["year"].tolist(), arc_columns["origin"].tolist(),
+                                                              arc_columns["destination"].tolist(), arc_columns["count"].tolist())):
+        yearly_arcs[str(year)].append({
+            "type": "transfer",
+            "from": codes[origin],
+            "to": codes[destination],
+            "startLat": float(lat[origin]),
+            "startLong": float(lng[origin]),
+            "endLat": float(lat[destination]),
+            "endLong": float(lng[destination]),
+            "color": arc_color,
+            "scale": arc_scale,
+            "count": count,
+            "players": [table.display_names[n] for n in arc_columns["names"][name_offsets[i]:name_offsets[i + 1]].tolist()],
+            "player_ids": [table.player_ids[p] for p in arc_columns["players"][player_offsets[i]:player_offsets[i + 1]].tolist()]
+        })
+    return yearly_arcs
+
+def load_build_state(path=build_state_path):
+    """Load the previous run's dependency state, or None if it is missing or from another version"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            state = json.load(f)
+        except json.JSONDecodeError:
+            return None
+    return state if state.get("version") == build_state_version else None
+
+def save_build_state(state, path=build_state_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+def changed_years(previous_inputs, current_inputs):
+    """Years whose source seasons were added, removed or modified between two runs"""
+    years = set()
+    for filename in set(previous_inputs) | set(current_inputs):
+        previous_seasons = previous_inputs.get(filename, {}).get("seasons", {})
+        current_seasons = current_inputs.get(filename, {}).get("seasons", {})
+        for season_name in set(previous_seasons) | set(current_seasons):
+            previous = previous_seasons.get(season_name)
+            current = current_seasons.get(season_name)
+            if previous != current:
+                years.update(entry["year"] for entry in (previous, current) if entry and entry["year"])
+    return years
+
+def affected_years(previous_players, player_database, previous_order=None):
+    """Years of every transfer belonging to a player whose record changed (display names and dedup ripple across years)
+    or whose place in the database order did (arc and member order follow it).
+
+    previous_order lists the previous player ids in database order, defaulting to previous_players' own order.
+    """
+    moved = reordered_players(previous_players if previous_order is None else previous_order, player_database)
+    years = set()
+    for player_id in set(previous_players) | set(player_database):
+        previous = previous_players.get(player_id)
+        current = player_database.get(player_id)
+        if previous != current or player_id in moved:
+            for record in (previous, current):
+                if record:
+                    years.update(transfer["year"] for transfer in record["transfers"])
+    return years
+
+def remove_stale_files(folder_path, prefix, current_files):
+    """Delete the files of folder_path starting with prefix that a run no longer writes"""
+    for filename in os.listdir(folder_path):
+        if filename.startswith(prefix) and filename not in current_files:
+            os.remove(os.path.join(folder_path, filename))
+
+def queue_arc_outputs(args, emitter, table, arc_columns, coordinates, stats, flows=True):
+    """Queue the files built from every year's arcs: the packed arcs, the flow tables (unless flows is False) and the arc indexes"""
+    if args.arc_format != "json":
+        with stats.stage("encode_packed"):
+            emitter.submit(packed_arcs_path, encode_packed_arcs(table, arc_columns, coordinates, arc_color, arc_scale, year_range))
+
+    # Cumulative country-pair flows for year-range queries
+    if flows:
+        with stats.stage("encode_flows"):
+            emitter.submit(flow_tables_path, encode_flow_tables(build_flow_tables(table, arc_columns, year_range)))
+
+    # Player and country lookups into the year files
+    with stats.stage("encode_indexes"):
+        emitter.submit(arc_indexes_path, encode_arc_indexes(build_arc_indexes(table, arc_columns, year_range)))
+
+def queue_year_files(args, emitter, year, arcs, dirty_years):
+    """Queue the lines_{year}.json file and arc tiers of one year, unless the year is clean and they all exist.
+
+    Returns ({path: arc count} of the queued lines files, every file of the year).
+    """
+    files, arc_counts = {}, {}
+    if args.arc_format != "packed":
+        output_filename = os.path.join(output_folder_path, f'lines_{year}.json')
+        files[output_filename] = {
             "type": "Transfer",
             "arcs": arcs
         }
-        output_filename = os.path.join(output_folder_path, f'lines_{year}.json')
-        with open(output_filename, 'w', encoding='utf-8') as f:
-            json.dump(lines_data, f, indent=4)
+        arc_counts[output_filename] = len(arcs)
+    if args.arc_tiers:
+        files.update(encode_arc_tiers(year, arcs, arc_color, arc_scale, args.top_arcs))
 
-        print(f"✅ {output_filename} successfully generated with {len(arcs)} consolidated arcs!")
+    for path, data in files.items():
+        if dirty_years is not None and year not in dirty_years and all(os.path.exists(p) for p in emitter.paths(path)):
+            arc_counts.pop(path, None)
+            continue
+        emitter.submit(path, data)
+    return arc_counts, list(files)
+
+def report_outputs(args, written, player_count, shard_files, name_files, year_arc_counts, stats):
+    """Print what a run wrote and count the year files"""
+    stats.count("bytes_written", sum(written.values()))
+    if player_db_path in written:
+        if written[player_db_path]:
+            print(f"✅ Player database successfully generated with {player_count} players!")
+        else:
+            print(f"✅ Player database unchanged ({player_count} players).")
+    if args.player_format != "monolithic":
+        rewritten = sum(1 for filename in shard_files if written.get(os.path.join(player_shards_folder_path, filename)))
+        print(f"✅ Player database sharded into {len(shard_files) - 1} files ({rewritten} rewritten)!")
+    rewritten = sum(1 for filename in name_files if filename != name_index_filename and written.get(os.path.join(name_index_folder_path, filename)))
+    print(f"✅ Name index split into {len(name_files) - 1} shards ({rewritten} rewritten)!")
+    for path in (packed_arcs_path, flow_tables_path, arc_indexes_path):
+        if written.get(path):
+            print(f"✅ {path} successfully generated!")
+    for output_filename, arc_count in year_arc_counts.items():
+        if written.get(output_filename):
+            stats.count("arc_files_written")
+            stats.count("arcs_written", arc_count)
+            print(f"✅ {output_filename} successfully generated with {arc_count} consolidated arcs!")
+
+def write_outputs(args, player_database, country_info, dirty_years=None, stats=None):
+    """Generate and write every output file of the player database.
+
+    Year files outside dirty_years that already exist are left alone
+    (None rewrites all of them). Returns the output paths for the build state.
+    """
+    stats = PipelineStats() if stats is None else stats
+    # Queue the player database, whole and/or sharded
+    emitter = Emitter(args.minify, args.compress, args.emit_workers)
+    shard_files = {}
+    if args.player_format != "sharded":
+        emitter.submit(player_db_path, {"players": player_database})
+
+    if args.player_format != "monolithic":
+        os.makedirs(player_shards_folder_path, exist_ok=True)
+        shard_files = encode_player_shards(player_database, args.player_shard_size, args.player_shard_mode,
+                                           indent=None if args.minify else 4)
+        for filename, content in shard_files.items():
+            emitter.submit(os.path.join(player_shards_folder_path, filename), content)
+        remove_stale_files(player_shards_folder_path, "players_", {path for filename in shard_files for path in emitter.paths(filename)})
+
+    # Queue the type-ahead name index, dropping shards left over from a previous run
+    with stats.stage("name_index"):
+        os.makedirs(name_index_folder_path, exist_ok=True)
+        name_files = encode_name_index(player_database)
+        for filename, data in name_files.items():
+            emitter.submit(os.path.join(name_index_folder_path, filename), data)
+        remove_stale_files(name_index_folder_path, "names_", {path for filename in name_files for path in emitter.paths(filename)})
+
+    # Generate arcs based on the deduplicated player database
+    with stats.stage("arcs"):
+        with stats.stage("table"):
+            table = TransferTable.from_player_database(player_database)
+            coordinates = country_coordinates(country_info, table.country_codes)
+        with stats.stage("aggregate"):
+            arc_columns = table.aggregate_arcs(coordinates[2])
+        with stats.stage("yearly"):
+            if args.arc_format == "packed" and not args.arc_tiers:
+                yearly_arcs = {}
+            else:
+                yearly_arcs = build_yearly_arcs(table, arc_columns, coordinates)
+    stats.count("transfers", len(table))
+    stats.count("arcs", len(arc_columns["count"]))
+
+    queue_arc_outputs(args, emitter, table, arc_columns, coordinates, stats)
+
+    # Queue arcs (and their tiers) for each affected year if within valid range
+    year_arc_counts, year_files = {}, []
+    if args.arc_tiers:
+        os.makedirs(arc_tiers_folder_path, exist_ok=True)
+    for year, arcs in yearly_arcs.items():
+        if year_range[0] <= int(year) <= year_range[1]:
+            arc_counts, files = queue_year_files(args, emitter, year, arcs, dirty_years)
+            year_arc_counts.update(arc_counts)
+            year_files.extend(files)
+
+    # Encode, compress and write everything queued
+    outputs = [path for file in dict.fromkeys([*emitter.pending, *year_files]) for path in emitter.paths(file)]
+    with stats.stage("emit"):
+        written = emitter.run()
+
+    report_outputs(args, written, len(player_database), shard_files, name_files, year_arc_counts, stats)
+    return outputs
+
+def write_store_outputs(args, store, country_info, dirty_years=None, stats=None):
+    """write_outputs for a TransferStore, without loading its player database.
+
+    players.json, the player shards and the name index are streamed from
+    queries, and the arcs are queried and written one year at a time. Only
+    the arc columns of every year are gathered, for the packed, flow and
+    index files, so memory follows the size of the arcs, not of the players.
+    """
+    stats = PipelineStats() if stats is None else stats
+    emitter = Emitter(args.minify, args.compress, args.emit_workers)
+    indent = None if args.minify else 4
+    player_count = store.player_count()
+    written, shard_files = {}, []
+
+    with stats.stage("stream_players"):
+        if args.player_format != "sharded":
+            fragments = (player_fragment(player_id, player_data, indent) for player_id, player_data in store.iter_players())
+            written[player_db_path] = emit_stream(player_db_path, player_file_chunks(fragments, indent), args.compress)
+
+        if args.player_format != "monolithic":
+            os.makedirs(player_shards_folder_path, exist_ok=True)
+            shard_count, shard_counts, boundaries = store.assign_player_shards(args.player_shard_size, args.player_shard_mode)
+            for shard in range(shard_count):
+                path = os.path.join(player_shards_folder_path, shard_filename(shard))
+                fragments = (player_fragment(player_id, player_data, indent) for player_id, player_data in store.iter_players(shard))
+                written[path] = emit_stream(path, player_file_chunks(fragments, indent), args.compress)
+                shard_files.append(shard_filename(shard))
+            index = shard_index(args.player_shard_mode, args.player_shard_size, shard_counts, boundaries)
+            separators = (",", ":") if args.minify else None
+            written[os.path.join(player_shards_folder_path, player_index_filename)] = emit_file(
+                os.path.join(player_shards_folder_path, player_index_filename), json.dumps(index, indent=indent, separators=separators),
+                compress=args.compress)
+            shard_files.append(player_index_filename)
+            remove_stale_files(player_shards_folder_path, "players_", {path for filename in shard_files for path in emitter.paths(filename)})
+
+    # The name index shards are written as they fill up
+    with stats.stage("name_index"):
+        os.makedirs(name_index_folder_path, exist_ok=True)
+        name_files = []
+        for filename, data in name_index_files(store.iter_name_terms(), player_count):
+            path = os.path.join(name_index_folder_path, filename)
+            written[path] = emit_file(path, data, args.minify, args.compress)
+            name_files.append(filename)
+        remove_stale_files(name_index_folder_path, "names_", {path for filename in name_files for path in emitter.paths(filename)})
+
+    # Query, write and gather the arcs year by year
+    year_arc_counts, year_files = {}, []
+    if args.arc_tiers:
+        os.makedirs(arc_tiers_folder_path, exist_ok=True)
+    with stats.stage("arcs"):
+        country_codes = store.country_codes()
+        lat, lng, valid = country_coordinates(country_info, country_codes)
+        valid_coordinates = {code: (float(lat[i]), float(lng[i])) for i, code in enumerate(country_codes) if valid[i]}
+        # Seeded with the table's country and player order, so the encoded files match the in-memory path
+        arc_table = YearlyArcColumns(country_codes, store.player_ids())
+        for year, arcs in store.iter_yearly_arcs(valid_coordinates, arc_color, arc_scale):
+            arc_table.set_year(year, arcs)
+            if year_range[0] <= int(year) <= year_range[1]:
+                arc_counts, files = queue_year_files(args, emitter, year, arcs, dirty_years)
+                year_arc_counts.update(arc_counts)
+                year_files.extend(files)
+            if len(emitter.pending) >= emit_batch_size:
+                written.update(emitter.run())
+        arc_columns = arc_table.columns()
+    stats.count("transfers", store.transfer_count())
+    stats.count("arcs", len(arc_columns["count"]))
+
+    queue_arc_outputs(args, emitter, arc_table, arc_columns, country_coordinates(country_info, arc_table.country_codes), stats)
+    with stats.stage("emit"):
+        written.update(emitter.run())
+
+    outputs = [path for file in dict.fromkeys([*written, *year_files]) for path in emitter.paths(file)]
+    report_outputs(args, written, player_count, shard_files, name_files, year_arc_counts, stats)
+    return outputs
+
+def build_parser(description="Download zerozero transfer data and generate the globe arc files."):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--skip-fetch", action="store_true", help="Use the local transfer files without checking for updates")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_WORKERS, help="Maximum number of concurrent downloads")
+    parser.add_argument("--api-base-url", default=api_base_url, help="Base URL of the transfers endpoint (e.g. a local mockZerozero.py server)")
+    parser.add_argument("--force", action="store_true", help="Regenerate every output even if no input changed")
+    parser.add_argument("--workers", type=int, default=1, help="Ingest competition files in N worker processes")
+    parser.add_argument("--verify-workers", action="store_true", help="Also ingest serially and check both paths give the same player database")
+    parser.add_argument("--arc-format", choices=("json", "packed", "both"), default="json",
+                        help="Write lines_{year}.json files, the packed lines.bin file, or both")
+    parser.add_argument("--player-format", choices=("monolithic", "sharded", "both"), default="monolithic",
+                        help="Write players.json, sharded player files with an index, or both")
+    parser.add_argument("--player-shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Players per shard")
+    parser.add_argument("--player-shard-mode", choices=SHARD_MODES, default="range", help="Split shards by player-id range or by hash")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every competition file instead of reusing normalized records from the cache")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES, help="Normalized files kept in the cache before the least recently used are evicted")
+    parser.add_argument("--store", nargs="?", const=transfer_store_path, metavar="PATH",
+                        help="Keep the normalized transfers in an SQLite store (reused between runs) and derive players and arcs from it")
+    parser.add_argument("--arc-tiers", action="store_true",
+                        help="Also write per-year arc summaries and separate player detail files under arcs/tiers")
+    parser.add_argument("--top-arcs", type=int, default=0, metavar="N", help="With --arc-tiers, also write the N busiest arcs of each year")
+    parser.add_argument("--minify", action="store_true", help="Write compact JSON instead of indented JSON")
+    parser.add_argument("--compress", action="store_true", help="Also write .gz (and .br when brotli is installed) copies of every output")
+    parser.add_argument("--emit-workers", type=int, default=os.cpu_count() or 1, help="Encode and compress output files in N worker processes")
+    parser.add_argument("--report", help="Write per-stage timings, peak memory and counters to this JSON file")
+    parser.add_argument("--profile", type=int, nargs="?", const=25, default=0, metavar="TOP",
+                        help="Profile the ingestion loop with cProfile and add its TOP functions to the report")
+    return parser
+
+def output_options(args):
+    """The arguments that shape the generated files (a change invalidates the build state)"""
+    return {
+        "arc_format": args.arc_format,
+        "player_format": args.player_format,
+        "player_shard_size": args.player_shard_size,
+        "player_shard_mode": args.player_shard_mode,
+        "arc_tiers": args.arc_tiers,
+        "top_arcs": args.top_arcs,
+        "minify": args.minify,
+        "compress": args.compress
+    }
 
-print("All files processed.")
\ No newline at end of file
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    options = output_options(args)
+    stats = PipelineStats(profile_top=args.profile)
+    if args.profile and args.workers > 1:
+        print("Warning: with --workers the profile only covers the merge in the main process.")
+
+    run_pipeline(args, options, stats)
+
+    if args.report:
+        stats.write(args.report)
+        print(f"📊 Run report written to {args.report}")
+
+def run_pipeline(args, options, stats):
+    # Download transfer files only if needed
+    if not args.skip_fetch:
+        with stats.stage("fetch"):
+            results = update_transfer_files(transfers_folder_path, workers=args.fetch_workers, base_url=args.api_base_url)
+        for status in results.values():
+            stats.count(f"files_{status}")
+
+    # Hash the inputs and compare them with the previous run
+    with stats.stage("hash_inputs"):
+        transfer_files = list_transfer_files()
+        input_hashes = {f: hash_file(os.path.join(transfers_folder_path, f)) for f in transfer_files}
+        map_hash = hash_file(map_file_path)
+        state = None if args.force else load_build_state()
+
+    if (state and state["map_md5"] == map_hash and state["options"] == options
+            and {f: entry["md5"] for f, entry in state["inputs"].items()} == input_hashes
+            and all(os.path.exists(path) for path in state["outputs"])):
+        print("✅ No transfer file changed since the last run, nothing to regenerate.")
+        return
+
+    # A new map or different output options invalidate every file
+    if state and (state["map_md5"] != map_hash or state["options"] != options):
+        state = None
+    previous_inputs = state["inputs"] if state else {}
+
+    country_info = load_country_info()
+
+    # Process each transfer file, recording the seasons of the ones that changed
+    changed_files = {f for f in transfer_files if f not in previous_inputs or previous_inputs[f]["md5"] != input_hashes[f]}
+    stats.count("files_ingested", len(transfer_files))
+    store = TransferStore(args.store) if args.store else None
+    if store is not None:
+        # Only files the store has not seen are parsed; dedup and display names run as queries
+        with stats.stage("ingest"), stats.profile("ingest"):
+            records_parsed, season_indexes = sync_transfer_store(store, transfer_files, input_hashes, country_info, changed_files)
+        stats.count("records_parsed", records_parsed)
+
+        with stats.stage("build_player_database"):
+            duplicates, merges = store.rebuild(dedupe_player_transfers)
+        stats.count("duplicate_transfers_skipped", duplicates)
+        stats.count("consecutive_year_merges", merges)
+
+        with stats.stage("display_names"):
+            shared_names = store.assign_display_names()
+        for name, count in shared_names:
+            print(f"Found {count} players with name '{name}'")
+        stats.count("name_collisions", len(shared_names))
+        stats.count("players", store.player_count())
+    else:
+        cache = None if args.no_cache else NormalizeCache(max_entries=args.cache_size, salt=map_hash)
+        with stats.stage("ingest"), stats.profile("ingest"):
+            ingest, season_indexes = ingest_transfer_files(transfer_files, country_info, changed_files, args.workers,
+                                                           cache=cache, file_hashes=input_hashes)
+        if cache is not None:
+            stats.count("cache_hits", cache.hits)
+            stats.count("cache_misses", cache.misses)
+        stats.count("records_parsed", ingest.records_parsed)
+        stats.count("duplicate_transfers_skipped", ingest.duplicates_skipped)
+
+        with stats.stage("build_player_database"):
+            player_database, country_flags = ingest.build_player_database()
+
+        if args.verify_workers:
+            with stats.stage("verify_workers"):
+                serial_ingest, _ = ingest_transfer_files(transfer_files, country_info, workers=1)
+                serial_output = json.dumps(serial_ingest.build_player_database())
+            if serial_output != json.dumps((player_database, country_flags)):
+                raise SystemExit(f"❌ Ingestion with {args.workers} workers does not match the serial path.")
+            print(f"✅ Ingestion with {args.workers} workers matches the serial path.")
+
+        with stats.stage("dedupe"):
+            stats.count("consecutive_year_merges", dedupe_player_transfers(player_database))
+        with stats.stage("display_names"):
+            stats.count("name_collisions", assign_display_names(player_database))
+        stats.count("players", len(player_database))
+    current_inputs = {
+        f: {"md5": input_hashes[f], "seasons": season_indexes[f]} if f in changed_files else previous_inputs[f]
+        for f in transfer_files
+    }
+
+    # Work out which years depend on something that changed
+    dirty_years = None
+    if state and store is not None:
+        # The store remembers the players of its previous rebuild, as long as that run wrote the current outputs
+        if state.get("store") == args.store:
+            with stats.stage("dirty_years"):
+                dirty_years = changed_years(previous_inputs, current_inputs) | store.affected_years()
+    elif state and state.get("players") is not None:
+        # The previous player order comes from the build state, since shards do not keep it
+        with stats.stage("dirty_years"):
+            # Read back whichever player files this format writes; a players.json left by another format is stale
+            previous_players = {}
+            if args.player_format == "sharded":
+                if os.path.exists(os.path.join(player_shards_folder_path, player_index_filename)):
+                    previous_players = load_all_players()
+            elif os.path.exists(player_db_path):
+                with open(player_db_path, 'r', encoding='utf-8') as f:
+                    previous_players = json.load(f)["players"]
+            dirty_years = changed_years(previous_inputs, current_inputs) | affected_years(previous_players, player_database, state["players"])
+    if dirty_years is not None:
+        print(f"🔎 {len(dirty_years)} year(s) affected by changed seasons: {', '.join(sorted(dirty_years)) or 'none'}")
+
+    if store is not None:
+        with store:
+            outputs = write_store_outputs(args, store, country_info, dirty_years, stats)
+    else:
+        outputs = write_outputs(args, player_database, country_info, dirty_years, stats)
+
+    save_build_state({
+        "version": build_state_version,
+        "map_md5": map_hash,
+        "options": options,
+        "store": args.store,
+        "players": list(player_database) if store is None else None,
+        "inputs": current_inputs,
+        "outputs": sorted(outputs)
+    })
+
+    print("All files processed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import gzip
+import json
+import os
+import stat
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # .br siblings are only written when brotli is installed
+    brotli = None
+
+# Output files are encoded, compressed and written atomically, optionally in worker processes
+BROTLI_QUALITY = 9
+STREAM_BLOCK_SIZE = 1 << 20
+
+# Read once at import: os.umask() can only be read by setting it, which is not thread-safe
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def encode_json(data, minify=False):
+    if minify:
+        return json.dumps(data, separators=(",", ":"))
+    return json.dumps(data, indent=4)
+
+
+def replace_file(temp_path, path):
+    """Rename temp_path over path, giving it path's permissions, or the ones open() would
+    create it with, instead of mkstemp's private 0600 (the output folder is served)."""
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.chmod(temp_path, mode)
+    os.replace(temp_path, path)
+
+
+def atomic_write(path, data):
+    """Write bytes through a temporary file in the same folder and rename it over path,
+    so readers see either the old or the new file, never a partial one."""
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        replace_file(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def write_if_changed(path, content):
+    """Write text or bytes to path unless the file already holds exactly that content. Returns the bytes written (0 if unchanged)."""
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return 0
+    atomic_write(path, data)
+    return len(data)
+
+
+def compression_suffixes(compress):
+    if not compress:
+        return []
+    return [".gz", ".br"] if brotli is not None else [".gz"]
+
+
+def compress_data(data, suffix):
+    if suffix == ".gz":
+        # mtime=0 keeps the output identical for identical input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def compress_stream(blocks, suffix):
+    """compress_data for an iterable of byte blocks; the joined output equals compress_data of the joined input"""
+    if suffix == ".gz":
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+    else:
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    for block in blocks:
+        yield process(block)
+    yield finish()
+
+
+def read_blocks(path, block_size=STREAM_BLOCK_SIZE):
+    with open(path, 'rb') as f:
+        while block := f.read(block_size):
+            yield block
+
+
+def same_content(path, other_path):
+    if not os.path.exists(path) or os.path.getsize(path) != os.path.getsize(other_path):
+        return False
+    return all(a == b for a, b in zip(read_blocks(path), read_blocks(other_path)))
+
+
+def stream_if_changed(path, blocks):
+    """write_if_changed for an iterable of byte blocks, never holding the whole file.
+
+    The blocks go to a temporary file that replaces path only if it differs.
+    Returns the bytes written (0 if unchanged).
+    """
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=os.path.dirname(path) or ".")
+    try:
+        size = 0
+        with os.fdopen(fd, 'wb') as f:
+            for block in blocks:
+                size += f.write(block)
+        if same_content(path, temp_path):
+            os.remove(temp_path)
+            return 0
+        replace_file(temp_path, path)
+        return size
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def emit_stream(path, chunks, compress=False):
+    """emit_file for text produced piece by piece (e.g. a players file streamed from the store). Returns the bytes written"""
+    written = stream_if_changed(path, (chunk.encode('utf-8') for chunk in chunks))
+    for suffix in compression_suffixes(compress):
+        if written or not os.path.exists(path + suffix):
+            written += stream_if_changed(path + suffix, compress_stream(read_blocks(path), suffix))
+    return written
+
+
+def emit_file(path, content, minify=False, compress=False):
+    """Encode content (bytes, text or JSON-able data) and write it and its compressed siblings.
+
+    Siblings are only recompressed when the file itself changed or one is
+    missing. Returns the bytes written.
+    """
+    if isinstance(content, bytes):
+        data = content
+    else:
+        data = (content if isinstance(content, str) else encode_json(content, minify)).encode('utf-8')
+    written = write_if_changed(path, data)
+    for suffix in compression_suffixes(compress):
+        if written or not os.path.exists(path + suffix):
+            written += write_if_changed(path + suffix, compress_data(data, suffix))
+    return written
+
+
+class Emitter:
+    """Collects output files and writes them in one go.
+
+    submit() queues a file; run() encodes, compresses and writes everything,
+    spread over `workers` processes, and returns {path: bytes written}.
+    """
+
+    def __init__(self, minify=False, compress=False, workers=1):
+        self.minify = minify
+        self.compress = compress
+        self.workers = workers
+        self.pending = {}
+
+    def submit(self, path, content):
+        self.pending[path] = content
+
+    def paths(self, path):
+        """path and its compressed siblings"""
+        return [path] + [path + suffix for suffix in compression_suffixes(self.compress)]
+
+    def run(self):
+        paths = list(self.pending)
+        contents = [self.pending[path] for path in paths]
+        self.pending = {}
+        if self.workers > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                written = list(pool.map(emit_file, paths, contents, [self.minify] * len(paths), [self.compress] * len(paths)))
+        else:
+            written = [emit_file(path, content, self.minify, self.compress) for path, content in zip(paths, contents)]
+        return dict(zip(paths, written))
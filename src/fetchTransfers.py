@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from emitOutputs import replace_file
+
+# Competitions downloaded from zerozero (output file -> competition id)
+transfers_api_config = {
+    "transfers_ALE.json": 11,
+    "transfers_ARG.json": 70,
+    "transfers_ASA.json": 518,
+    "transfers_BEL.json": 15,
+    "transfers_BRA.json": 51,
+    "transfers_CHI.json": 117,
+    "transfers_ESP.json": 5,
+    "transfers_EUA.json": 25,
+    "transfers_FRA.json": 13,
+    "transfers_ING.json": 4,
+    "transfers_ITA.json": 10,
+    "transfers_MEX.json": 1485,
+    "transfers_PBA.json": 12,
+    "transfers_POR.json": 3,
+    "transfers_TUR.json": 24
+}
+
+api_base_url = "http://direct.zerozero.pt/api/v1/getGraphPlayersTransfersCountryCompet"
+app_key = "tY9Qv2xP"
+
+# Fetch defaults: concurrency cap, (connect, read) timeout in seconds and retry policy
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = (5, 60)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+CHUNK_SIZE = 64 * 1024
+
+# Per-file content hash, size and HTTP validators of the fetched competitions.
+# Kept out of src/files, which is the folder the web app serves
+transfer_manifest_path = './.cache/transfer_manifest.json'
+
+
+def hash_file(path):
+    """MD5 of a file's raw bytes, read in chunks."""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path=transfer_manifest_path):
+    """Load the transfer manifest, or an empty one if missing or unreadable."""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Corrupted {manifest_path}, rebuilding it.")
+            return {}
+
+
+def save_manifest(manifest, manifest_path=transfer_manifest_path):
+    """Atomically write the transfer manifest."""
+    folder_path = os.path.dirname(manifest_path) or "."
+    os.makedirs(folder_path, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=folder_path, suffix=".tmp", delete=False) as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    replace_file(f.name, manifest_path)
+
+
+def local_entry(folder_path, filename, entry):
+    """Return the manifest entry for a local file, rehashing it if the manifest does not describe it."""
+    output_path = os.path.join(folder_path, filename)
+    if not os.path.exists(output_path):
+        return None
+    if entry and entry.get("size") == os.path.getsize(output_path):
+        return entry
+    return {"md5": hash_file(output_path), "size": os.path.getsize(output_path)}
+
+
+def build_api_url(compet_id, base_url=api_base_url, key=app_key):
+    """Build the getGraphPlayersTransfersCountryCompet URL for a competition."""
+    return f"{base_url}/AppKey/{key}/competID/{compet_id}"
+
+
+def create_session(workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """Create a Session whose keep-alive pool holds one connection per worker and retries with backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, pool_block=True, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_competition(session, filename, compet_id, folder_path, entry=None, base_url=api_base_url, key=app_key, timeout=DEFAULT_TIMEOUT):
+    """Download one competition and replace the local file if its content changed.
+
+    The request is conditional on the ETag/Last-Modified recorded in ``entry``,
+    and the body is streamed to a temp file and hashed on the fly, so an
+    unchanged competition is never parsed. Returns (status, manifest entry,
+    status line), status being "updated", "unchanged" or "failed"; the line is
+    left for the caller to print, so lines from pool threads never interleave.
+    """
+    api_url = build_api_url(compet_id, base_url, key)
+    output_path = os.path.join(folder_path, filename)
+    entry = local_entry(folder_path, filename, entry)
+    fetched_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    temp_path = None
+    try:
+        with session.get(api_url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304:
+                return "unchanged", {**entry, "compet_id": compet_id, "fetched_at": fetched_at}, f"✅ {filename} is up-to-date."
+            response.raise_for_status()
+
+            # Stream new data to a temp file in the same folder, hashing as it arrives
+            digest = hashlib.md5()
+            size = 0
+            with tempfile.NamedTemporaryFile('wb', dir=folder_path, suffix=".tmp", delete=False) as f:
+                temp_path = f.name
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+            new_entry = {
+                "compet_id": compet_id,
+                "md5": digest.hexdigest(),
+                "size": size,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": fetched_at
+            }
+
+        if entry and entry["md5"] == new_entry["md5"]:
+            os.remove(temp_path)
+            return "unchanged", new_entry, f"✅ {filename} is up-to-date."
+
+        replace_file(temp_path, output_path)
+        return "updated", new_entry, f"🔁 {filename} updated."
+
+    except requests.exceptions.RequestException as e:
+        message = f"❌ Failed to fetch {filename}: {e}"
+    except Exception as e:
+        message = f"❌ Unexpected error for {filename}: {e}"
+
+    if temp_path and os.path.exists(temp_path):
+        os.remove(temp_path)
+    return "failed", entry, message
+
+
+def update_transfer_files(folder_path, config=None, workers=DEFAULT_WORKERS, base_url=api_base_url, key=app_key,
+                          timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF,
+                          manifest_path=transfer_manifest_path):
+    """Download every configured competition over a bounded thread pool sharing one pooled Session.
+
+    Updates the manifest at manifest_path (one per transfer folder) and
+    returns a dict of filename -> fetch status.
+    """
+    config = transfers_api_config if config is None else config
+    workers = max(1, min(workers, len(config) or 1))
+    print(f"\U0001F504 Checking for updates to transfer data ({len(config)} competitions, {workers} workers)...")
+
+    manifest = load_manifest(manifest_path)
+    results = {}
+    with create_session(workers, retries, backoff) as session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_competition, session, filename, compet_id, folder_path, manifest.get(filename), base_url, key, timeout): filename
+            for filename, compet_id in config.items()
+        }
+        for future in as_completed(futures):
+            filename = futures[future]
+            results[filename], entry, message = future.result()
+            print(message)
+            if entry:
+                manifest[filename] = entry
+
+    save_manifest(manifest, manifest_path)
+    print("✔️ Transfer files update check complete.\n")
+    return results
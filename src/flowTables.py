@@ -0,0 +1,115 @@
+import argparse
+import json
+
+import numpy as np
+
+# Cumulative-by-year transfer counts, so any [start, end] range is one subtraction
+flow_tables_path = './src/files/flows.json'
+
+
+def build_flow_tables(table, arc_columns, year_range=(1950, 2025)):
+    """Prefix sums over years of the arc counts, per country pair and per country.
+
+    Built from the same aggregated arcs as the lines_{year}.json files, so a
+    range total always equals the sum of the matching arc counts. Row i of
+    each table holds the running totals for first_year..last_year.
+    """
+    first_year, last_year = year_range
+    year_count = last_year - first_year + 1
+    keep = (arc_columns["year"] >= first_year) & (arc_columns["year"] <= last_year)
+    year_offset = arc_columns["year"][keep].astype(np.int64) - first_year
+    origin = arc_columns["origin"][keep].astype(np.int64)
+    destination = arc_columns["destination"][keep].astype(np.int64)
+    count = arc_columns["count"][keep].astype(np.int64)
+
+    # Only countries and pairs that appear get a row
+    countries = np.unique(np.concatenate((origin, destination)))
+    country_row = np.full(len(table.country_codes), -1, dtype=np.int64)
+    country_row[countries] = np.arange(len(countries))
+    origin, destination = country_row[origin], country_row[destination]
+
+    pair_key = origin * len(countries) + destination
+    pairs, pair_row = np.unique(pair_key, return_inverse=True)
+
+    pair_flows = np.zeros((len(pairs), year_count), dtype=np.int64)
+    np.add.at(pair_flows, (pair_row, year_offset), count)
+    outbound = np.zeros((len(countries), year_count), dtype=np.int64)
+    np.add.at(outbound, (origin, year_offset), count)
+    inbound = np.zeros((len(countries), year_count), dtype=np.int64)
+    np.add.at(inbound, (destination, year_offset), count)
+
+    return {
+        "first_year": first_year,
+        "last_year": last_year,
+        "countries": [table.country_codes[c] for c in countries.tolist()],
+        "pairs": np.stack((pairs // len(countries), pairs % len(countries)), axis=1).tolist() if len(pairs) else [],
+        "pair_cumulative": np.cumsum(pair_flows, axis=1).tolist(),
+        "outbound_cumulative": np.cumsum(outbound, axis=1).tolist(),
+        "inbound_cumulative": np.cumsum(inbound, axis=1).tolist()
+    }
+
+
+def encode_flow_tables(flows):
+    return json.dumps(flows, separators=(",", ":"))
+
+
+def range_total(cumulative, first_year, start, end):
+    """Sum of a prefix-summed row over [start, end], clamped to the table's years"""
+    last = min(end, first_year + len(cumulative) - 1) - first_year
+    before = max(start, first_year) - first_year - 1
+    if last < 0 or last <= before:
+        return 0
+    return cumulative[last] - (cumulative[before] if before >= 0 else 0)
+
+
+class FlowTables:
+    """Constant-time year-range queries over flows.json"""
+
+    def __init__(self, flows):
+        self.flows = flows
+        self.first_year = flows["first_year"]
+        self.country_index = {code: i for i, code in enumerate(flows["countries"])}
+        self.pair_index = {(origin, destination): i for i, (origin, destination) in enumerate(flows["pairs"])}
+
+    @classmethod
+    def load(cls, path=flow_tables_path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def pair_total(self, from_country, to_country, start, end):
+        """Transfers from one country to another between start and end (inclusive)"""
+        origin = self.country_index.get(from_country)
+        destination = self.country_index.get(to_country)
+        pair = self.pair_index.get((origin, destination))
+        if pair is None:
+            return 0
+        return range_total(self.flows["pair_cumulative"][pair], self.first_year, start, end)
+
+    def outbound_total(self, country, start, end):
+        if country not in self.country_index:
+            return 0
+        return range_total(self.flows["outbound_cumulative"][self.country_index[country]], self.first_year, start, end)
+
+    def inbound_total(self, country, start, end):
+        if country not in self.country_index:
+            return 0
+        return range_total(self.flows["inbound_cumulative"][self.country_index[country]], self.first_year, start, end)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query transfer totals over a range of years.")
+    parser.add_argument("--from", dest="from_country", help="Origin country code")
+    parser.add_argument("--to", dest="to_country", help="Destination country code")
+    parser.add_argument("--start", type=int, required=True, help="First year (inclusive)")
+    parser.add_argument("--end", type=int, required=True, help="Last year (inclusive)")
+    parser.add_argument("--path", default=flow_tables_path, help="Flow tables file")
+    args = parser.parse_args()
+
+    tables = FlowTables.load(args.path)
+    if args.from_country and args.to_country:
+        print(f"{args.from_country} → {args.to_country}, {args.start}-{args.end}: "
+              f"{tables.pair_total(args.from_country, args.to_country, args.start, args.end)}")
+    elif args.from_country:
+        print(f"{args.from_country} outbound, {args.start}-{args.end}: {tables.outbound_total(args.from_country, args.start, args.end)}")
+    elif args.to_country:
+        print(f"{args.to_country} inbound, {args.start}-{args.end}: {tables.inbound_total(args.to_country, args.start, args.end)}")
@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from fetchTransfers import app_key, build_api_url, transfers_api_config, update_transfer_files
+
+# Local stand-in for the zerozero getGraphPlayersTransfersCountryCompet endpoint
+endpoint_path = "/api/v1/getGraphPlayersTransfersCountryCompet"
+endpoint_pattern = re.compile(rf"^{endpoint_path}/AppKey/([^/]+)/competID/(\d+)/?$")
+
+transfers_folder_path = "./src/files/transfers"
+
+
+def load_payloads(folder_path=transfers_folder_path, config=None):
+    """Map each competition id to the raw bytes it should be served with.
+
+    Competitions without a local file reuse the available files in turn, so
+    the full config can be served from whatever is committed.
+    """
+    config = transfers_api_config if config is None else config
+    local_files = sorted(f for f in os.listdir(folder_path) if f.startswith("transfers_") and f.endswith(".json"))
+    if not local_files:
+        raise FileNotFoundError(f"No transfer files found in {folder_path}")
+
+    payloads = {}
+    for index, (filename, compet_id) in enumerate(sorted(config.items())):
+        source = filename if filename in local_files else local_files[index % len(local_files)]
+        with open(os.path.join(folder_path, source), 'rb') as f:
+            payloads[str(compet_id)] = f.read()
+    return payloads
+
+
+class MockZerozeroServer:
+    """Threaded HTTP server answering competition requests after a configurable latency.
+
+    ``fail_rate`` makes a share of requests answer 503 so retries can be exercised.
+    Responses carry an ETag and Last-Modified and honour If-None-Match with 304.
+    """
+
+    def __init__(self, payloads, latency=0.0, fail_rate=0.0, host="127.0.0.1", port=0):
+        self.payloads = payloads
+        self.etags = {compet_id: f'"{hashlib.md5(body).hexdigest()}"' for compet_id, body in payloads.items()}
+        self.last_modified = formatdate(usegmt=True)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{endpoint_path}"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                match = endpoint_pattern.match(self.path)
+                if not match or match.group(1) != app_key:
+                    self._send(404, json.dumps({"error_code": "404", "error_text": "Not found"}).encode('utf-8'))
+                elif random.random() < server.fail_rate:
+                    self._send(503, json.dumps({"error_code": "503", "error_text": "Unavailable"}).encode('utf-8'))
+                elif match.group(2) not in server.payloads:
+                    self._send(200, json.dumps({"error_code": "1", "error_text": "Unknown competition", "data": {}}).encode('utf-8'))
+                elif self.headers.get("If-None-Match") == server.etags[match.group(2)]:
+                    self._send(304, b"", match.group(2))
+                else:
+                    self._send(200, server.payloads[match.group(2)], match.group(2))
+
+            def _send(self, status, body, compet_id=None):
+                self.send_response(status)
+                if compet_id:
+                    self.send_header("ETag", server.etags[compet_id])
+                    self.send_header("Last-Modified", server.last_modified)
+                if status != 304:
+                    self.send_header("Content-Type", "application/json; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def fetch_sequential(folder_path, config, base_url):
+    """The original update loop: one plain requests.get per competition, one after another."""
+    for filename, compet_id in config.items():
+        try:
+            response = requests.get(build_api_url(compet_id, base_url))
+            response.raise_for_status()
+            with open(os.path.join(folder_path, filename), 'w', encoding='utf-8') as f:
+                json.dump(response.json(), f, ensure_ascii=False, indent=2)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Failed to fetch {filename}: {e}")
+
+
+def benchmark_fetch(latency=0.5, workers=4, fail_rate=0.0, config=None):
+    """Time the sequential loop against the pooled concurrent fetcher on the local stand-in."""
+    config = transfers_api_config if config is None else config
+    payloads = load_payloads(config=config)
+
+    with MockZerozeroServer(payloads, latency=latency, fail_rate=fail_rate) as server:
+        with tempfile.TemporaryDirectory() as sequential_dir, tempfile.TemporaryDirectory() as concurrent_dir:
+            start = time.perf_counter()
+            fetch_sequential(sequential_dir, config, server.base_url)
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            update_transfer_files(concurrent_dir, config, workers=workers, base_url=server.base_url, backoff=0.05,
+                                  manifest_path=os.path.join(concurrent_dir, "manifest.json"))
+            concurrent_time = time.perf_counter() - start
+
+            # Second pass revalidates against the manifest (conditional requests only)
+            start = time.perf_counter()
+            update_transfer_files(concurrent_dir, config, workers=workers, base_url=server.base_url, backoff=0.05,
+                                  manifest_path=os.path.join(concurrent_dir, "manifest.json"))
+            revalidate_time = time.perf_counter() - start
+
+    result = {
+        "competitions": len(config),
+        "latency": latency,
+        "workers": workers,
+        "sequential_seconds": round(sequential_time, 3),
+        "concurrent_seconds": round(concurrent_time, 3),
+        "revalidate_seconds": round(revalidate_time, 3),
+        "speedup": round(sequential_time / concurrent_time, 2) if concurrent_time else None
+    }
+    print(f"⏱️ Sequential: {result['sequential_seconds']}s | Concurrent ({workers} workers): "
+          f"{result['concurrent_seconds']}s | Speedup: {result['speedup']}x | Revalidate: {result['revalidate_seconds']}s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the zerozero transfers endpoint.")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to wait before answering each request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on when serving")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetch workers for --benchmark")
+    parser.add_argument("--benchmark", action="store_true", help="Compare the sequential loop with the concurrent fetcher and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_fetch(args.latency, args.workers, args.fail_rate)
+    else:
+        server = MockZerozeroServer(load_payloads(), args.latency, args.fail_rate, port=args.port)
+        print(f"🌐 Serving zerozero stand-in at {server.base_url} (latency {args.latency}s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
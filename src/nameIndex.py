@@ -0,0 +1,136 @@
+import argparse
+import bisect
+import json
+import os
+import time
+import unicodedata
+
+# Type-ahead index over display names: sorted, accent-free search terms cut
+# into small shards of consecutive terms, like the range-mode player shards
+name_index_folder_path = './src/files/names'
+index_filename = 'index.json'
+
+DEFAULT_SHARD_ENTRIES = 2000
+
+# Letters that NFKD does not split into a base letter and an accent
+FOLDED_LETTERS = str.maketrans({"ø": "o", "æ": "ae", "œ": "oe", "đ": "d", "ð": "d", "ł": "l", "þ": "th", "ı": "i"})
+
+
+def normalize_name(name):
+    """Lowercase, accent-free form of a name with single spaces ("José  Álvarez" -> "jose alvarez")"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().translate(FOLDED_LETTERS).split())
+
+
+def name_terms(display_name):
+    """Search terms of a display name: the whole name and every suffix starting at a word,
+    so "Lionel Messi" is found by typing "lio" or "mes"."""
+    words = normalize_name(display_name).split(" ")
+    return {" ".join(words[i:]) for i in range(len(words)) if words[i]}
+
+
+def shard_filename(shard):
+    return f"names_{shard:04d}.json"
+
+
+def name_index_files(term_players, player_count, shard_entries=DEFAULT_SHARD_ENTRIES):
+    """(filename, JSON-able data) of each name index shard, then of the index file.
+
+    term_players yields (term, [(player_id, display_name)]) in term order, so
+    the shards can be written as they fill up. The sorted terms are cut into
+    shards of about shard_entries player ids (a single very common term may
+    exceed it). Each shard holds its terms, the player ids of each term and
+    the display names of those players. index.json lists every shard's first
+    and last term, so a prefix only opens the shards it falls in.
+    """
+    index = {"shard_entries": shard_entries, "player_count": player_count, "term_count": 0, "shards": []}
+
+    def shard_file(chunk):
+        filename = shard_filename(len(index["shards"]))
+        index["shards"].append({"file": filename, "first": chunk[0][0], "last": chunk[-1][0]})
+        return filename, {
+            "terms": [term for term, _ in chunk],
+            "ids": [[player_id for player_id, _ in players] for _, players in chunk],
+            "names": {player_id: display_name for _, players in chunk for player_id, display_name in players}
+        }
+
+    chunk, entries = [], 0
+    for term, players in term_players:
+        index["term_count"] += 1
+        if chunk and entries + len(players) > shard_entries:
+            yield shard_file(chunk)
+            chunk, entries = [], 0
+        chunk.append((term, players))
+        entries += len(players)
+    if chunk:
+        yield shard_file(chunk)
+    yield index_filename, index
+
+
+def encode_name_index(player_database, shard_entries=DEFAULT_SHARD_ENTRIES):
+    """{filename: JSON-able data} of the name index of a player database (see name_index_files)"""
+    term_players = {}
+    for player_id, player_data in player_database.items():
+        display_name = player_data.get("display_name", player_data["name"])
+        for term in name_terms(display_name):
+            term_players.setdefault(term, []).append((player_id, display_name))
+    return dict(name_index_files(((term, term_players[term]) for term in sorted(term_players)), len(player_database), shard_entries))
+
+
+class NameIndex:
+    """Prefix search over the name index files, loading each shard on first use"""
+
+    def __init__(self, folder_path=name_index_folder_path):
+        self.folder_path = folder_path
+        with open(os.path.join(folder_path, index_filename), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.last_terms = [shard["last"] for shard in self.index["shards"]]
+        self.shards = {}
+
+    def shard(self, position):
+        if position not in self.shards:
+            with open(os.path.join(self.folder_path, self.index["shards"][position]["file"]), 'r', encoding='utf-8') as f:
+                self.shards[position] = json.load(f)
+        return self.shards[position]
+
+    def search(self, query, limit=10):
+        """[(player_id, display_name)] of up to limit players with a name term starting with query"""
+        query = normalize_name(query)
+        if not query:
+            return []
+        results = {}
+        # The first shard that can hold the query, then the following ones while their terms still match
+        for position in range(bisect.bisect_left(self.last_terms, query), len(self.last_terms)):
+            first = self.index["shards"][position]["first"]
+            if first > query and not first.startswith(query):
+                break
+            shard = self.shard(position)
+            terms = shard["terms"]
+            term = bisect.bisect_left(terms, query)
+            while term < len(terms) and terms[term].startswith(query):
+                for player_id in shard["ids"][term]:
+                    if player_id not in results:
+                        results[player_id] = shard["names"][player_id]
+                        if len(results) == limit:
+                            return list(results.items())
+                term += 1
+            if term < len(terms):
+                break
+        return list(results.items())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search players by name.")
+    parser.add_argument("query", help="Start of a name (accents and case are ignored)")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum number of results")
+    parser.add_argument("--folder", default=name_index_folder_path)
+    args = parser.parse_args()
+
+    names = NameIndex(args.folder)
+    started = time.perf_counter()
+    results = names.search(args.query, args.limit)
+    elapsed = time.perf_counter() - started
+    for player_id, display_name in results:
+        print(f"{player_id}: {display_name}")
+    print(f"🔎 {len(results)} result(s) in {elapsed * 1000:.3f} ms")
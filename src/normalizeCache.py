@@ -0,0 +1,66 @@
+import hashlib
+import os
+import pickle
+
+# Normalized records of each competition file, stored under a hash of the file's content.
+# Kept out of src/files, which is the folder the web app serves
+cache_folder_path = './.cache/normalized'
+
+# Bump whenever the cached records change shape
+CACHE_VERSION = 2
+DEFAULT_MAX_ENTRIES = 64
+
+
+class NormalizeCache:
+    """Pickled per-file ingest results keyed by content hash.
+
+    The key covers the file's md5 and name (the name carries the
+    competition's country code) plus a salt for anything else the records
+    depend on, such as the map. Reading an entry marks it as recently used;
+    evict() drops the least recently used entries beyond max_entries.
+    """
+
+    def __init__(self, folder_path=cache_folder_path, max_entries=DEFAULT_MAX_ENTRIES, salt=""):
+        self.folder_path = folder_path
+        self.max_entries = max_entries
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, filename, file_md5):
+        return hashlib.md5(f"{CACHE_VERSION}:{self.salt}:{filename}:{file_md5}".encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder_path, f"{key}.pickle")
+
+    def load(self, key):
+        """The cached value for key, or None"""
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def store(self, key, value):
+        os.makedirs(self.folder_path, exist_ok=True)
+        temp_path = f"{self.path(key)}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path(key))
+
+    def entries(self):
+        """Cache files, most recently used first"""
+        paths = [os.path.join(self.folder_path, f) for f in os.listdir(self.folder_path) if f.endswith('.pickle')]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def evict(self):
+        if not os.path.isdir(self.folder_path):
+            return
+        for path in self.entries()[self.max_entries:]:
+            os.remove(path)
+
@@ -0,0 +1,227 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from transferTable import intern
+
+# Every year's arcs in one little-endian file:
+#   header | string table | countries | year index | arc columns | arc members
+# Each section starts on an 8-byte boundary. Strings (country codes, display
+# names, player ids, the arc color) are stored once and referenced by index.
+MAGIC = b"TARC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIIIIIIIIId")
+ALIGNMENT = 8
+
+packed_arcs_path = './src/files/arcs/lines.bin'
+output_folder_path = './src/files/arcs'
+
+
+def section_layout(counts):
+    """(name, dtype, length) of every section after the header, in file order"""
+    return [
+        ("string_offsets", "<u4", counts["strings"] + 1),
+        ("string_blob", "u1", counts["blob"]),
+        ("country_codes", "<u4", counts["countries"]),
+        ("country_lat", "<f8", counts["countries"]),
+        ("country_lng", "<f8", counts["countries"]),
+        ("years", "<i4", counts["years"]),
+        ("year_arc_start", "<u4", counts["years"] + 1),
+        ("arc_origin", "<u2", counts["arcs"]),
+        ("arc_destination", "<u2", counts["arcs"]),
+        ("arc_count", "<u4", counts["arcs"]),
+        ("arc_name_start", "<u4", counts["arcs"] + 1),
+        ("arc_player_start", "<u4", counts["arcs"] + 1),
+        ("names", "<u4", counts["names"]),
+        ("players", "<u4", counts["players"])
+    ]
+
+
+def padding(size):
+    return -size % ALIGNMENT
+
+
+def encode_packed_arcs(table, arc_columns, coordinates, color='#F76B15', scale=0.5, year_range=(1950, 2025)):
+    """Pack the aggregated arcs of a TransferTable into bytes.
+
+    arc_columns is the result of TransferTable.aggregate_arcs and coordinates
+    the (lat, lng, valid) arrays of country_coordinates. Only years inside
+    year_range are kept, like the JSON files.
+    """
+    lat, lng, _ = coordinates
+    keep = (arc_columns["year"] >= year_range[0]) & (arc_columns["year"] <= year_range[1])
+    arcs = np.flatnonzero(keep)
+
+    strings = {}
+    color_index = intern(strings, color)
+
+    # Countries actually used by the kept arcs, in table order
+    used_countries = np.unique(np.concatenate((arc_columns["origin"][arcs], arc_columns["destination"][arcs])))
+    country_remap = np.zeros(len(table.country_codes), dtype=np.uint16)
+    country_remap[used_countries] = np.arange(len(used_countries))
+    country_strings = [intern(strings, table.country_codes[c]) for c in used_countries.tolist()]
+
+    # Arcs are sorted by year, so the kept ones (and their members) form one contiguous block
+    def gather(offsets, members, values):
+        if not len(arcs):
+            return np.zeros(1, dtype=np.int64), []
+        block = offsets[arcs[0]:arcs[-1] + 2]
+        member_strings = [intern(strings, values[m]) for m in members[block[0]:block[-1]].tolist()]
+        return block - block[0], member_strings
+
+    name_start, names = gather(arc_columns["name_offsets"], arc_columns["names"], table.display_names)
+    player_start, players = gather(arc_columns["player_offsets"], arc_columns["players"], table.player_ids)
+
+    kept_years = arc_columns["year"][arcs]
+    years, year_first = np.unique(kept_years, return_index=True)
+    year_arc_start = np.concatenate((year_first, [len(arcs)]))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = np.concatenate(([0], np.cumsum([len(value) for value in encoded])))
+    columns = {
+        "string_offsets": string_offsets,
+        "string_blob": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "country_codes": country_strings,
+        "country_lat": lat[used_countries],
+        "country_lng": lng[used_countries],
+        "years": years,
+        "year_arc_start": year_arc_start,
+        "arc_origin": country_remap[arc_columns["origin"][arcs]],
+        "arc_destination": country_remap[arc_columns["destination"][arcs]],
+        "arc_count": arc_columns["count"][arcs],
+        "arc_name_start": name_start,
+        "arc_player_start": player_start,
+        "names": names,
+        "players": players
+    }
+    counts = {
+        "strings": len(encoded), "blob": int(string_offsets[-1]), "countries": len(used_countries),
+        "years": len(years), "arcs": len(arcs), "names": len(names), "players": len(players)
+    }
+
+    parts = [HEADER.pack(MAGIC, FORMAT_VERSION, counts["strings"], counts["blob"], counts["countries"], counts["years"],
+                         counts["arcs"], counts["names"], counts["players"], color_index, scale)]
+    parts.append(b"\0" * padding(HEADER.size))
+    for name, dtype, length in section_layout(counts):
+        data = np.asarray(columns[name], dtype=dtype).tobytes()
+        assert len(data) == length * np.dtype(dtype).itemsize, name
+        parts.append(data)
+        parts.append(b"\0" * padding(len(data)))
+    return b"".join(parts)
+
+
+class PackedArcs:
+    """Reader for the packed arc file. Opening it only reads the header and
+    maps the sections; arcs(year) decodes that year's slice alone."""
+
+    def __init__(self, path=packed_arcs_path):
+        with open(path, 'rb') as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, string_count, blob_size, country_count, year_count,
+         arc_count, name_count, player_count, self._color, self.scale) = HEADER.unpack_from(self._buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} packed arc file")
+
+        counts = {
+            "strings": string_count, "blob": blob_size, "countries": country_count, "years": year_count,
+            "arcs": arc_count, "names": name_count, "players": player_count
+        }
+        self._sections = {}
+        offset = HEADER.size + padding(HEADER.size)
+        for name, dtype, length in section_layout(counts):
+            self._sections[name] = np.frombuffer(self._buffer, dtype=dtype, count=length, offset=offset)
+            size = length * np.dtype(dtype).itemsize
+            offset += size + padding(size)
+
+        self._year_index = {int(year): i for i, year in enumerate(self._sections["years"].tolist())}
+        self.color = self.string(self._color)
+
+    def string(self, index):
+        start, end = self._sections["string_offsets"][index:index + 2].tolist()
+        return self._sections["string_blob"][start:end].tobytes().decode('utf-8')
+
+    def years(self):
+        return [str(year) for year in self._year_index]
+
+    def arcs(self, year):
+        """The arcs of one year, shaped exactly like the "arcs" list of lines_{year}.json"""
+        if int(year) not in self._year_index:
+            return []
+        s = self._sections
+        i = self._year_index[int(year)]
+        first, last = s["year_arc_start"][i:i + 2].tolist()
+
+        codes = [self.string(index) for index in s["country_codes"].tolist()]
+        lat, lng = s["country_lat"], s["country_lng"]
+        name_start, player_start = s["arc_name_start"], s["arc_player_start"]
+
+        arcs = []
+        for a in range(first, last):
+            origin, destination = int(s["arc_origin"][a]), int(s["arc_destination"][a])
+            arcs.append({
+                "type": "transfer",
+                "from": codes[origin],
+                "to": codes[destination],
+                "startLat": float(lat[origin]),
+                "startLong": float(lng[origin]),
+                "endLat": float(lat[destination]),
+                "endLong": float(lng[destination]),
+                "color": self.color,
+                "scale": self.scale,
+                "count": int(s["arc_count"][a]),
+                "players": [self.string(n) for n in s["names"][name_start[a]:name_start[a + 1]].tolist()],
+                "player_ids": [self.string(p) for p in s["players"][player_start[a]:player_start[a + 1]].tolist()]
+            })
+        return arcs
+
+    def close(self):
+        self._sections = {}
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def verify_packed_arcs(path=packed_arcs_path, json_folder_path=output_folder_path):
+    """Check that every year of the packed file matches its lines_{year}.json"""
+    mismatches = []
+    with PackedArcs(path) as packed:
+        years = packed.years()
+        for year in years:
+            json_path = os.path.join(json_folder_path, f"lines_{year}.json")
+            if not os.path.exists(json_path):
+                mismatches.append(year)
+                continue
+            with open(json_path, 'r', encoding='utf-8') as f:
+                if json.load(f)["arcs"] != packed.arcs(year):
+                    mismatches.append(year)
+
+    if mismatches:
+        print(f"❌ Packed arcs differ from the JSON files: {', '.join(mismatches)}")
+    else:
+        print(f"✅ Packed arcs match the JSON files for all {len(years)} years.")
+    return not mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or verify the packed arc file.")
+    parser.add_argument("--path", default=packed_arcs_path, help="Packed arc file to read")
+    parser.add_argument("--year", help="Print the arcs of one year as JSON")
+    parser.add_argument("--verify", action="store_true", help="Check the packed file against the lines_{year}.json files")
+    args = parser.parse_args()
+
+    if args.verify:
+        raise SystemExit(0 if verify_packed_arcs(args.path) else 1)
+    with PackedArcs(args.path) as packed:
+        if args.year:
+            print(json.dumps({"type": "Transfer", "arcs": packed.arcs(args.year)}, indent=4))
+        else:
+            print(f"{len(packed.years())} years: {', '.join(packed.years())}")
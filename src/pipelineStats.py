@@ -0,0 +1,111 @@
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then left out
+    resource = None
+
+# Stage timers, counters and an optional profile of one createArcs run, as a JSON report
+STAGE_SEPARATOR = "/"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux and the BSDs
+    divisor = 2 ** 20 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+
+
+class PipelineStats:
+    """Collects per-stage timings and run counters.
+
+    Stages nest: a stage opened inside another is reported as "outer/inner".
+    Entering the same stage again adds to its times. Counters are plain
+    integers added up with count().
+    """
+
+    def __init__(self, profile_top=0):
+        self.started_at = datetime.now(timezone.utc)
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        self.stages = {}
+        self.counters = {}
+        self.profiles = {}
+        self.profile_top = profile_top
+        self._stack = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        path = STAGE_SEPARATOR.join(self._stack + [name])
+        self._stack.append(name)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            entry = self.stages.setdefault(path, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+            entry["wall_seconds"] += time.perf_counter() - wall
+            entry["cpu_seconds"] += time.process_time() - cpu
+            entry["calls"] += 1
+            entry["peak_rss_mb"] = peak_rss_mb()
+
+    @contextlib.contextmanager
+    def profile(self, name):
+        """Run the block under cProfile when profiling is on (profile_top > 0)"""
+        if not self.profile_top:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.profiles[name] = profiler
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def profile_summary(self, profiler):
+        """Top functions of a profile by cumulative time"""
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        rows = []
+        for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+            rows.append({
+                "function": f"{os.path.basename(filename)}:{line}({function})",
+                "calls": calls,
+                "total_seconds": round(total, 4),
+                "cumulative_seconds": round(cumulative, 4)
+            })
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:self.profile_top]
+
+    def report(self):
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(time.perf_counter() - self._wall, 4),
+            "cpu_seconds": round(time.process_time() - self._cpu, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": {
+                path: {**entry, "wall_seconds": round(entry["wall_seconds"], 4), "cpu_seconds": round(entry["cpu_seconds"], 4)}
+                for path, entry in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "profiles": {name: self.profile_summary(profiler) for name, profiler in self.profiles.items()}
+        }
+
+    def write(self, path):
+        """Write the JSON report, plus a .prof file per profile for snakeviz/pstats"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        for name, profiler in self.profiles.items():
+            profiler.dump_stats(f"{os.path.splitext(path)[0]}_{name}.prof")
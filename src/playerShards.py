@@ -0,0 +1,205 @@
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import time
+import zlib
+
+# Player database split into small files plus an index, so one record can be fetched on its own
+player_shards_folder_path = './src/files/players'
+player_db_path = './src/files/players.json'
+index_filename = 'index.json'
+
+DEFAULT_SHARD_SIZE = 500
+SHARD_MODES = ("range", "hash")
+
+
+def shard_filename(shard):
+    return f"players_{shard:04d}.json"
+
+
+def hash_shard(player_id, shard_count):
+    """Shard of a player id in hash mode (CRC-32 of the id string)"""
+    return zlib.crc32(str(player_id).encode('utf-8')) % shard_count
+
+
+def shard_assignment(player_ids, shard_size=DEFAULT_SHARD_SIZE, mode="range"):
+    """Where each player goes: (shard_count, {player_id: shard}, boundaries).
+
+    "range" sorts the (numeric) ids and cuts them into consecutive id ranges,
+    with boundaries listing each shard's (first_id, last_id); "hash" spreads
+    ids over ceil(players / shard_size) shards by CRC-32 (boundaries is None).
+    """
+    if mode not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {mode}")
+    player_ids = list(player_ids)
+    shard_count = max(1, math.ceil(len(player_ids) / shard_size))
+    if mode == "hash":
+        return shard_count, {player_id: hash_shard(player_id, shard_count) for player_id in player_ids}, None
+
+    ordered_ids = sorted(player_ids, key=int)
+    boundaries = []
+    for shard in range(shard_count):
+        chunk = ordered_ids[shard * shard_size:(shard + 1) * shard_size]
+        boundaries.append((int(chunk[0]), int(chunk[-1])) if chunk else (None, None))
+    return shard_count, {player_id: i // shard_size for i, player_id in enumerate(ordered_ids)}, boundaries
+
+
+def shard_index(mode, shard_size, shard_counts, boundaries=None):
+    """Contents of index.json, from the number of players in each shard"""
+    return {
+        "mode": mode,
+        "shard_size": shard_size,
+        "shard_count": len(shard_counts),
+        "player_count": sum(shard_counts),
+        "shards": [
+            {
+                "file": shard_filename(shard),
+                "count": count,
+                **({"first_id": boundaries[shard][0], "last_id": boundaries[shard][1]} if mode == "range" else {})
+            }
+            for shard, count in enumerate(shard_counts)
+        ]
+    }
+
+
+def player_fragment(player_id, player_data, indent=4):
+    """One player's '"id": {...}' entry, exactly as json.dumps({"players": ...}, indent=indent) writes it"""
+    if indent is None:
+        return f"{json.dumps(player_id)}:{json.dumps(player_data, separators=(',', ':'))}"
+    # The record sits two levels deep, so every line of it gains two indents
+    encoded = json.dumps(player_data, indent=indent).replace("\n", "\n" + " " * (2 * indent))
+    return f"{json.dumps(player_id)}: {encoded}"
+
+
+def player_file_chunks(fragments, indent=4):
+    """Text of {"players": {...}} built from player_fragment()s, piece by piece.
+
+    Joined, the chunks equal json.dumps of the whole dict, so a players file
+    can be written without holding the database, or rebuilt from cached
+    fragments of the players that did not change.
+    """
+    if indent is None:
+        opening, separator, closing, empty = '{"players":{', ",", "}}", '{"players":{}}'
+    else:
+        outer, inner = " " * indent, " " * (2 * indent)
+        opening, separator, closing = f'{{\n{outer}"players": {{\n{inner}', f",\n{inner}", f"\n{outer}}}\n}}"
+        empty = f'{{\n{outer}"players": {{}}\n}}'
+
+    first = True
+    for fragment in fragments:
+        yield (opening if first else separator) + fragment
+        first = False
+    yield empty if first else closing
+
+
+def encode_player_shards(player_database, shard_size=DEFAULT_SHARD_SIZE, mode="range", indent=4):
+    """Split the player database into shards of about shard_size players (see shard_assignment).
+
+    Returns {filename: JSON text}, including the index file; indent=None
+    writes compact JSON.
+    """
+    shard_count, shard_of, boundaries = shard_assignment(player_database, shard_size, mode)
+    shards = [{} for _ in range(shard_count)]
+    for player_id, player_data in player_database.items():
+        shards[shard_of[player_id]][player_id] = player_data
+    index = shard_index(mode, shard_size, [len(players) for players in shards], boundaries)
+
+    separators = (",", ":") if indent is None else None
+    files = {shard_filename(shard): json.dumps({"players": players}, indent=indent, separators=separators) for shard, players in enumerate(shards)}
+    files[index_filename] = json.dumps(index, indent=indent, separators=separators)
+    return files
+
+
+def load_player_index(folder_path=player_shards_folder_path):
+    with open(os.path.join(folder_path, index_filename), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def find_shard(index, player_id):
+    """Filename of the shard that holds player_id, or None if no shard can"""
+    if index["mode"] == "hash":
+        return index["shards"][hash_shard(player_id, index["shard_count"])]["file"]
+
+    last_ids = [shard["last_id"] for shard in index["shards"]]
+    shard = bisect.bisect_left(last_ids, int(player_id))
+    if shard < len(last_ids) and index["shards"][shard]["first_id"] <= int(player_id):
+        return index["shards"][shard]["file"]
+    return None
+
+
+def load_player(player_id, folder_path=player_shards_folder_path, index=None):
+    """Fetch a single player record by reading only the index and its shard"""
+    index = load_player_index(folder_path) if index is None else index
+    filename = find_shard(index, player_id)
+    if filename is None:
+        return None
+    with open(os.path.join(folder_path, filename), 'r', encoding='utf-8') as f:
+        return json.load(f)["players"].get(str(player_id))
+
+
+def load_all_players(folder_path=player_shards_folder_path):
+    """Reassemble the whole player database from the shards"""
+    players = {}
+    for shard in load_player_index(folder_path)["shards"]:
+        with open(os.path.join(folder_path, shard["file"]), 'r', encoding='utf-8') as f:
+            players.update(json.load(f)["players"])
+    return players
+
+
+def benchmark_player_loading(folder_path=player_shards_folder_path, monolithic_path=player_db_path, samples=200):
+    """Compare the startup cost of players.json with the index plus one shard per player lookup"""
+    with open(monolithic_path, 'rb') as f:
+        monolithic_bytes = f.read()
+    start = time.perf_counter()
+    players = json.loads(monolithic_bytes)["players"]
+    monolithic_parse = time.perf_counter() - start
+
+    with open(os.path.join(folder_path, index_filename), 'rb') as f:
+        index_bytes = f.read()
+    start = time.perf_counter()
+    index = json.loads(index_bytes)
+    index_parse = time.perf_counter() - start
+
+    sample_ids = random.Random(0).sample(sorted(players), min(samples, len(players)))
+    shard_bytes = []
+    start = time.perf_counter()
+    for player_id in sample_ids:
+        path = os.path.join(folder_path, find_shard(index, player_id))
+        with open(path, 'rb') as f:
+            data = f.read()
+        shard_bytes.append(len(data))
+        assert json.loads(data)["players"][player_id] == players[player_id]
+    lookup_time = (time.perf_counter() - start) / max(len(sample_ids), 1)
+
+    result = {
+        "players": len(players),
+        "shards": index["shard_count"],
+        "mode": index["mode"],
+        "monolithic_bytes": len(monolithic_bytes),
+        "monolithic_parse_ms": round(monolithic_parse * 1000, 3),
+        "index_bytes": len(index_bytes),
+        "index_parse_ms": round(index_parse * 1000, 3),
+        "average_shard_bytes": round(sum(shard_bytes) / max(len(shard_bytes), 1)),
+        "average_lookup_ms": round(lookup_time * 1000, 3)
+    }
+    print(f"📦 players.json: {result['monolithic_bytes']} bytes, parsed in {result['monolithic_parse_ms']} ms")
+    print(f"📦 index.json: {result['index_bytes']} bytes, parsed in {result['index_parse_ms']} ms "
+          f"({result['shards']} {result['mode']} shards)")
+    print(f"📦 One player: {result['average_shard_bytes']} bytes per shard, {result['average_lookup_ms']} ms per lookup")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Look up sharded player records or benchmark them against players.json.")
+    parser.add_argument("--folder", default=player_shards_folder_path, help="Folder holding index.json and the shards")
+    parser.add_argument("--player", help="Print one player's record")
+    parser.add_argument("--benchmark", action="store_true", help="Compare startup payload and parse time with players.json")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark_player_loading(args.folder)
+    elif args.player:
+        print(json.dumps(load_player(args.player, args.folder), indent=4, ensure_ascii=False))
@@ -0,0 +1,222 @@
+import argparse
+import json
+import os
+import random
+
+# zerozero-shaped transfers_*.json payloads with tunable sizes, for benchmarks
+map_file_path = './src/files/map.json'
+
+first_names = ["João", "Pedro", "Carlos", "Luis", "Diego", "Marco", "Jorge", "André", "Bruno", "Rafael",
+               "Miguel", "Lucas", "Mateo", "Hugo", "Iván", "Tomás", "Kevin", "Paulo", "Sergio", "Álvaro"]
+last_names = ["Silva", "Santos", "Pereira", "Gómez", "Fernández", "Rossi", "Müller", "Costa", "Martins", "López",
+              "Ferreira", "Sánchez", "Oliveira", "Díaz", "Ramos", "Torres", "Alves", "Moreno", "Rocha", "Castro"]
+positions = ["Guarda-Redes", "Defesa", "Médio", "Avançado"]
+
+# Base (1x) sizes: roughly the volume of one committed competition file per competition
+DEFAULT_SIZES = {
+    "competitions": 4,
+    "seasons": 20,
+    "clubs": 16,
+    "countries_per_club": 3,
+    "players_per_country": 4,
+    "list_share": 0.3,
+    "duplicate_rate": 0.1,
+    "first_year": 2000
+}
+
+
+def load_countries(map_path=map_file_path):
+    """(id, code) of every country on the map"""
+    with open(map_path, 'r', encoding='utf-8') as f:
+        return [(entry["id"], entry["text"]) for entry in json.load(f)["coordinates"]]
+
+
+def season_name(competition_name, year, index):
+    """Alternate the season name formats extract_year has to handle"""
+    if index % 3 == 0:
+        return f"{competition_name} {year}/{year + 1}"
+    if index % 3 == 1:
+        return f"{competition_name} {year}"
+    return f"{competition_name} {year}/{str(year + 1)[2:]}"
+
+
+class SyntheticTransfers:
+    """Generates a consistent set of competitions.
+
+    Every competition has its own clubs; transfers from or to a country that
+    has a competition use that competition's clubs and, with duplicate_rate,
+    also appear mirrored in its teams_out (exact duplicates across files) or
+    again in the next season (consecutive-year duplicates).
+    """
+
+    def __init__(self, competitions, seasons, clubs, countries_per_club, players_per_country,
+                 list_share, duplicate_rate, first_year, seed=0, map_path=map_file_path):
+        self.rng = random.Random(seed)
+        self.seasons = seasons
+        self.clubs = clubs
+        self.countries_per_club = countries_per_club
+        self.players_per_country = players_per_country
+        self.list_share = list_share
+        self.duplicate_rate = duplicate_rate
+        self.first_year = first_year
+        self.countries = load_countries(map_path)
+        self.next_id = 1000
+
+        # Competitions cycle through the map countries; filenames stay unique
+        self.competitions = []
+        for index in range(competitions):
+            country_id, code = self.countries[index % len(self.countries)]
+            filename = f"transfers_{code}.json" if index < len(self.countries) else f"transfers_{index:04d}_{code}.json"
+            club_ids = [self.new_id() for _ in range(clubs)]
+            self.competitions.append({
+                "filename": filename, "compet_id": 10000 + index, "country_id": country_id, "code": code,
+                "name": f"Liga {code}", "clubs": club_ids
+            })
+        self.by_country = {competition["country_id"]: competition for competition in self.competitions}
+        self.players = []
+
+    def new_id(self):
+        self.next_id += 1
+        return str(self.next_id)
+
+    def player(self):
+        """A new or (about a third of the time) an already generated player"""
+        if self.players and self.rng.random() < 0.35:
+            return self.rng.choice(self.players)
+        player = {
+            "id": self.new_id(),
+            "name": f"{self.rng.choice(first_names)} {self.rng.choice(last_names)}",
+            "posicao": self.rng.choice(positions),
+            "dt_nascimento": f"{self.rng.randint(1960, 2006)}-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}"
+        }
+        self.players.append(player)
+        return player
+
+    def partner_country(self):
+        """Half of the transfers involve another generated competition's country, like the real files"""
+        if len(self.competitions) > 1 and self.rng.random() < 0.5:
+            return self.rng.choice(self.competitions)["country_id"]
+        return self.rng.choice(self.countries)[0]
+
+    def club_of(self, country_id):
+        competition = self.by_country.get(country_id)
+        return self.rng.choice(competition["clubs"]) if competition else self.new_id()
+
+    def generate(self):
+        """{filename: payload dict} for every competition"""
+        seasons = {c["filename"]: {} for c in self.competitions}
+        names = {c["filename"]: [season_name(c["name"], self.first_year + i, i) for i in range(self.seasons)] for c in self.competitions}
+
+        def club_entry(competition, season_index, club_id):
+            clubs = seasons[competition["filename"]].setdefault(names[competition["filename"]][season_index], {})
+            return clubs.setdefault(club_id, {
+                "id": club_id,
+                "img": f"https://www.zerozero.pt//img/logos/equipas/{club_id}_imgbank.png",
+                "fk_continente": "1",
+                "name": f"Clube {club_id}",
+                "teams_in": {},
+                "teams_out": {}
+            })
+
+        def add_player(club, direction, country_id, player, other_club_id):
+            block = club[direction].setdefault(str(country_id), {
+                "color": "000000",
+                "logo": f"https://www.zerozero.pt//img/bandeiras/{country_id}_imgbank_flag.png",
+                "name": f"País {country_id}",
+                "continente": "",
+                "country": f"País {country_id}",
+                "count": "0",
+                "players": {}
+            })
+            entry = {
+                "name": player["name"],
+                "posicao": player["posicao"],
+                "link": f"/jogador/{player['id']}",
+                "dt_nascimento": player["dt_nascimento"],
+                "transfers_id": self.new_id(),
+                "club_id": other_club_id,
+                "club_descr": f"Clube {other_club_id}"
+            }
+            block["players"][player["id"]] = entry
+            block["count"] = str(len(block["players"]))
+
+        for competition in self.competitions:
+            for season_index in range(self.seasons):
+                for club_id in competition["clubs"]:
+                    club = club_entry(competition, season_index, club_id)
+                    for direction in ("teams_in", "teams_out"):
+                        for _ in range(self.countries_per_club):
+                            country_id = self.partner_country()
+                            if country_id == competition["country_id"]:
+                                continue
+                            for _ in range(self.players_per_country):
+                                player = self.player()
+                                other_club_id = self.club_of(country_id)
+                                add_player(club, direction, country_id, player, other_club_id)
+
+                                # Mirror into the other country's competition (exact duplicate)
+                                other = self.by_country.get(country_id)
+                                if other and self.rng.random() < self.duplicate_rate:
+                                    mirror_direction = "teams_out" if direction == "teams_in" else "teams_in"
+                                    add_player(club_entry(other, season_index, other_club_id), mirror_direction,
+                                               competition["country_id"], player, club_id)
+
+                                # Repeat in the next season (consecutive-year duplicate)
+                                if season_index + 1 < self.seasons and self.rng.random() < self.duplicate_rate:
+                                    add_player(club_entry(competition, season_index + 1, club_id), direction,
+                                               country_id, player, other_club_id)
+
+        payloads = {}
+        for competition in self.competitions:
+            season_data = {}
+            for name, clubs in seasons[competition["filename"]].items():
+                season_data[name] = [self.shape_players(club) for club in clubs.values()]
+            payloads[competition["filename"]] = {
+                "error_code": "0",
+                "error_text": "",
+                "data": {"Name": competition["name"], "Img": "https://www.zerozero.pt/img/logos/competicoes/", "seasons": season_data}
+            }
+        return payloads
+
+    def shape_players(self, club):
+        """Turn a share of the players blocks into the list shape (with an "id" per player)"""
+        for direction in ("teams_in", "teams_out"):
+            for block in club[direction].values():
+                if self.rng.random() < self.list_share:
+                    block["players"] = [{"id": player_id, **entry} for player_id, entry in block["players"].items()]
+        return club
+
+    def api_config(self):
+        """{filename: competition id}, like transfers_api_config"""
+        return {competition["filename"]: competition["compet_id"] for competition in self.competitions}
+
+
+def scaled_sizes(scale, **overrides):
+    """Sizes for a scale factor: more competitions, everything else as in the base"""
+    sizes = {**DEFAULT_SIZES, **overrides}
+    sizes["competitions"] = max(1, round(sizes["competitions"] * scale))
+    return sizes
+
+
+def generate_transfer_files(folder_path, seed=0, **sizes):
+    """Write synthetic competition files to folder_path. Returns {filename: competition id}"""
+    generator = SyntheticTransfers(seed=seed, **{**DEFAULT_SIZES, **sizes})
+    os.makedirs(folder_path, exist_ok=True)
+    for filename, payload in generator.generate().items():
+        with open(os.path.join(folder_path, filename), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+    return generator.api_config()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic zerozero transfer files.")
+    parser.add_argument("folder", help="Output folder")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier on the number of competitions")
+    parser.add_argument("--seed", type=int, default=0)
+    for name, default in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=None)
+    args = parser.parse_args()
+
+    overrides = {name: getattr(args, name) for name in DEFAULT_SIZES if getattr(args, name) is not None}
+    config = generate_transfer_files(args.folder, args.seed, **scaled_sizes(args.scale, **overrides))
+    print(f"✅ {len(config)} synthetic competitions written to {args.folder}")
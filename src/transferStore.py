@@ -0,0 +1,474 @@
+import bisect
+import json
+import math
+import os
+import sqlite3
+from itertools import groupby
+
+from countryFlags import player_country_flags
+from nameIndex import name_terms
+from playerShards import SHARD_MODES, hash_shard
+
+# On-disk store of the normalized transfers, kept between runs (outside the served src/files)
+transfer_store_path = './.cache/transfers.sqlite'
+
+# Bump whenever the schema or the normalized rows change
+STORE_VERSION = 1
+BATCH_SIZE = 5000
+
+# Columns of a record's rank, in comparison order (the file name replaces the file index)
+RANK_FIELDS = ("file", "season", "club", "direction", "country", "player_index")
+RANK_COLUMNS = ", ".join(RANK_FIELDS)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    file TEXT PRIMARY KEY,
+    md5 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    file TEXT NOT NULL, season TEXT NOT NULL, club INTEGER NOT NULL, direction INTEGER NOT NULL,
+    country INTEGER NOT NULL, player_index INTEGER NOT NULL,
+    player_id TEXT NOT NULL, name TEXT, position TEXT, birth_date TEXT,
+    year TEXT NOT NULL, from_country TEXT, to_country TEXT,
+    from_club_id TEXT, from_club_name TEXT, to_club_id TEXT, to_club_name TEXT,
+    PRIMARY KEY ({RANK_COLUMNS})
+);
+CREATE INDEX IF NOT EXISTS records_player ON records (player_id);
+CREATE TABLE IF NOT EXISTS flag_records (
+    file TEXT NOT NULL, season TEXT NOT NULL, club INTEGER NOT NULL, direction INTEGER NOT NULL,
+    country INTEGER NOT NULL, code TEXT NOT NULL, url TEXT NOT NULL,
+    PRIMARY KEY (file, season, club, direction, country)
+);
+CREATE TABLE IF NOT EXISTS players (
+    player_id TEXT PRIMARY KEY,
+    ord INTEGER NOT NULL,
+    name TEXT, position TEXT, birth_date TEXT, display_name TEXT,
+    country_flags TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_ord ON players (ord);
+CREATE INDEX IF NOT EXISTS players_name ON players (name);
+CREATE TABLE IF NOT EXISTS player_transfers (
+    row INTEGER PRIMARY KEY,
+    player_id TEXT NOT NULL, year TEXT NOT NULL, from_country TEXT, to_country TEXT,
+    from_club_id TEXT, from_club_name TEXT, to_club_id TEXT, to_club_name TEXT
+);
+CREATE INDEX IF NOT EXISTS player_transfers_player ON player_transfers (player_id);
+CREATE INDEX IF NOT EXISTS player_transfers_flow ON player_transfers (year, from_country, to_country);
+CREATE INDEX IF NOT EXISTS player_transfers_from_club ON player_transfers (from_club_id);
+CREATE INDEX IF NOT EXISTS player_transfers_to_club ON player_transfers (to_club_id);
+"""
+
+TRANSFER_FIELDS = ("year", "from_country", "to_country", "from_club_id", "from_club_name", "to_club_id", "to_club_name")
+
+
+def columns(alias, fields):
+    return ", ".join(f"{alias}.{field}" for field in fields)
+
+
+def reordered_players(previous_order, current_order):
+    """Players in both orders whose position relative to the others changed.
+
+    Arcs and their members follow the database order, so these players'
+    years must be rewritten even if their records did not change. They are
+    the players outside a longest subsequence that kept its relative order.
+    """
+    previous_rank = {player_id: rank for rank, player_id in enumerate(previous_order)}
+    common = [player_id for player_id in current_order if player_id in previous_rank]
+
+    # Longest increasing subsequence of the previous ranks (patience sorting)
+    tails, tail_positions, parents = [], [], []
+    for position, player_id in enumerate(common):
+        length = bisect.bisect_left(tails, previous_rank[player_id])
+        parents.append(tail_positions[length - 1] if length else None)
+        if length == len(tails):
+            tails.append(previous_rank[player_id])
+            tail_positions.append(position)
+        else:
+            tails[length] = previous_rank[player_id]
+            tail_positions[length] = position
+
+    kept = set()
+    position = tail_positions[-1] if tail_positions else None
+    while position is not None:
+        kept.add(position)
+        position = parents[position]
+    return {player_id for position, player_id in enumerate(common) if position not in kept}
+
+
+class StoreIngest:
+    """Drop-in for TransferIngest that upserts one file's records into the store in batches.
+
+    The file index at the front of each rank is replaced by the file name, so
+    rows stay valid when files are added or removed between runs.
+    """
+
+    def __init__(self, store, filename):
+        self.store = store
+        self.filename = filename
+        self.records_parsed = 0
+        self.transfers = []
+        self.flags = []
+
+    def add_flag(self, code, logo_url, rank):
+        self.flags.append((self.filename,) + rank[1:5] + (code, logo_url))
+
+    def add_transfer(self, player_id, player, year, from_country, to_country,
+                     from_club_id, from_club_name, to_club_id, to_club_name, rank):
+        self.transfers.append((self.filename,) + rank[1:] + (
+            player_id, player["name"], player.get("posicao", "Unknown"), player.get("dt_nascimento", "Unknown"),
+            year, from_country, to_country, from_club_id, from_club_name, to_club_id, to_club_name))
+        if len(self.transfers) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        with self.store.connection:
+            self.store.connection.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                              self.transfers)
+            self.store.connection.executemany("INSERT OR REPLACE INTO flag_records VALUES (?, ?, ?, ?, ?, ?, ?)", self.flags)
+        self.transfers, self.flags = [], []
+
+
+class TransferStore:
+    """SQLite store of normalized transfer records and the player database derived from them.
+
+    records holds every transfer of every file with its rank; rebuild()
+    derives players and player_transfers from it with the same rules as the
+    in-memory path, and the arc and player queries read from those.
+    """
+
+    def __init__(self, path=transfer_store_path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS records; DROP TABLE IF EXISTS flag_records;
+                DROP TABLE IF EXISTS players; DROP TABLE IF EXISTS player_transfers;
+            """)
+            self.connection.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def file_hashes(self):
+        return dict(self.connection.execute("SELECT file, md5 FROM files"))
+
+    def delete_file(self, filename):
+        for table in ("records", "flag_records", "files"):
+            self.connection.execute(f"DELETE FROM {table} WHERE file = ?", (filename,))
+
+    def begin_file(self, filename):
+        """Drop a file's rows and return a StoreIngest that records them again"""
+        with self.connection:
+            self.delete_file(filename)
+        return StoreIngest(self, filename)
+
+    def finish_file(self, ingest, file_md5):
+        ingest.flush()
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?)", (ingest.filename, file_md5))
+
+    def remove_files(self, keep):
+        """Forget every file not in keep"""
+        stale = [f for f in self.file_hashes() if f not in keep]
+        with self.connection:
+            for filename in stale:
+                self.delete_file(filename)
+        return stale
+
+    def country_flags(self):
+        """code -> (rank, flag URL) of the lowest-ranked flag of each country"""
+        rows = self.connection.execute("""
+            SELECT code, url, file, season, club, direction, country FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY code ORDER BY file, season, club, direction, country) AS n
+                FROM flag_records
+            ) WHERE n = 1
+        """)
+        return {code: ((file, season, club, direction, country, -1), url) for code, url, file, season, club, direction, country in rows}
+
+    def rebuild(self, dedupe_player_transfers):
+        """Derive players and player_transfers from records.
+
+        Exact duplicates (same player, year, countries and clubs) keep their
+        lowest-ranked row; each player takes the details of their lowest-ranked
+        row and players are ordered by it. Flags and the consecutive-year
+        dedup depend on transfer order, so they run player by player over an
+        ordered scan, with dedupe_player_transfers applied to each player.
+        The players of the previous rebuild are kept for affected_years().
+        Returns (duplicates skipped, consecutive-year merges).
+        """
+        country_flags = self.country_flags()
+
+        with self.connection:
+            # Keep the previous players for affected_years()
+            for table in ("players", "player_transfers"):
+                self.connection.execute(f"DROP TABLE IF EXISTS temp.previous_{table}")
+                self.connection.execute(f"CREATE TEMP TABLE previous_{table} AS SELECT * FROM {table}")
+            self.connection.execute("DELETE FROM players")
+            self.connection.execute("DELETE FROM player_transfers")
+            self.connection.execute("DROP TABLE IF EXISTS temp.unique_records")
+            self.connection.execute(f"""
+                CREATE TEMP TABLE unique_records AS
+                SELECT * FROM (
+                    SELECT *, ROW_NUMBER() OVER (
+                        PARTITION BY player_id, year, from_country, to_country, from_club_id, to_club_id
+                        ORDER BY {RANK_COLUMNS}) AS key_rank
+                    FROM records
+                ) WHERE key_rank = 1
+            """)
+            self.connection.execute("DROP TABLE IF EXISTS temp.player_order")
+            self.connection.execute(f"""
+                CREATE TEMP TABLE player_order AS
+                SELECT player_id, ROW_NUMBER() OVER (ORDER BY {RANK_COLUMNS}) AS ord, name, position, birth_date FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY player_id ORDER BY {RANK_COLUMNS}) AS player_rank FROM unique_records
+                ) WHERE player_rank = 1
+            """)
+            self.connection.execute("CREATE INDEX temp.player_order_id ON player_order (player_id)")
+            duplicates = (self.connection.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+                          - self.connection.execute("SELECT COUNT(*) FROM unique_records").fetchone()[0])
+
+            rows = self.connection.execute(f"""
+                SELECT o.ord, o.player_id, o.name, o.position, o.birth_date,
+                       {columns("u", RANK_FIELDS)}, {columns("u", TRANSFER_FIELDS)}
+                FROM player_order o JOIN unique_records u ON u.player_id = o.player_id
+                ORDER BY o.ord, {columns("u", RANK_FIELDS)}
+            """)
+            insert = self.connection.cursor()
+            merges, row_number, players, transfers = 0, 0, [], []
+            for (ord_, player_id, name, position, birth_date), player_rows in groupby(rows, key=lambda row: row[:5]):
+                ranked = [(row[5:11], dict(zip(TRANSFER_FIELDS, row[11:]))) for row in player_rows]
+
+                player_flags = player_country_flags([(rank, t["from_country"], t["to_country"]) for rank, t in ranked], country_flags)
+
+                player = {"transfers": [transfer for _, transfer in ranked]}
+                merges += dedupe_player_transfers({player_id: player})
+                players.append((player_id, ord_, name, position, birth_date, json.dumps(player_flags)))
+                for transfer in player["transfers"]:
+                    transfers.append((row_number, player_id) + tuple(transfer[field] for field in TRANSFER_FIELDS))
+                    row_number += 1
+
+                if len(transfers) >= BATCH_SIZE:
+                    insert.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?, NULL, ?)", players)
+                    insert.executemany("INSERT INTO player_transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", transfers)
+                    players, transfers = [], []
+            insert.executemany("INSERT INTO players VALUES (?, ?, ?, ?, ?, NULL, ?)", players)
+            insert.executemany("INSERT INTO player_transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", transfers)
+            self.connection.execute("DROP TABLE temp.unique_records")
+            self.connection.execute("DROP TABLE temp.player_order")
+        return duplicates, merges
+
+    def assign_display_names(self):
+        """Same display names as createArcs.assign_display_names, as one query. Returns [(name, players)] of shared names"""
+        with self.connection:
+            self.connection.execute("""
+                UPDATE players SET display_name = CASE
+                    WHEN shared.total = 1 THEN players.name
+                    WHEN players.birth_date != 'Unknown' AND length(players.birth_date) >= 4
+                        THEN players.name || ' (' || substr(players.birth_date, 1, 4) || ')'
+                    ELSE players.name || ' (' || shared.n || ')'
+                END
+                FROM (
+                    SELECT player_id, ROW_NUMBER() OVER (PARTITION BY name ORDER BY ord) AS n,
+                           COUNT(*) OVER (PARTITION BY name) AS total
+                    FROM players
+                ) AS shared
+                WHERE shared.player_id = players.player_id
+            """)
+        return self.connection.execute("""
+            SELECT name, COUNT(*) FROM players GROUP BY name HAVING COUNT(*) > 1 ORDER BY MIN(ord)
+        """).fetchall()
+
+    def player_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+
+    def transfer_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM player_transfers").fetchone()[0]
+
+    def player_ids(self):
+        """Player ids in player database order"""
+        return [player_id for (player_id,) in self.connection.execute("SELECT player_id FROM players ORDER BY ord")]
+
+    def country_codes(self):
+        """Country codes in the order TransferTable interns them (origin, then destination, of each transfer in turn)"""
+        return [code for (code,) in self.connection.execute("""
+            SELECT code FROM (
+                SELECT from_country AS code, MIN(row) * 2 AS first FROM player_transfers GROUP BY from_country
+                UNION ALL
+                SELECT to_country AS code, MIN(row) * 2 + 1 AS first FROM player_transfers GROUP BY to_country
+            ) GROUP BY code ORDER BY MIN(first)
+        """)]
+
+    def assign_player_shards(self, shard_size, mode="range"):
+        """playerShards.shard_assignment as a temp player_shards table, for iter_players(shard).
+
+        Returns (shard_count, players per shard, boundaries).
+        """
+        if mode not in SHARD_MODES:
+            raise ValueError(f"Unknown shard mode: {mode}")
+        shard_count = max(1, math.ceil(self.player_count() / shard_size))
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS temp.player_shards")
+            self.connection.execute("CREATE TEMP TABLE player_shards (player_id TEXT PRIMARY KEY, shard INTEGER NOT NULL)")
+            if mode == "hash":
+                self.connection.create_function("hash_shard", 2, hash_shard, deterministic=True)
+                self.connection.execute("INSERT INTO player_shards SELECT player_id, hash_shard(player_id, ?) FROM players", (shard_count,))
+            else:
+                # Consecutive numeric ids, ties kept in database order like a stable sort
+                self.connection.execute("""
+                    INSERT INTO player_shards
+                    SELECT player_id, (ROW_NUMBER() OVER (ORDER BY CAST(player_id AS INTEGER), ord) - 1) / ? FROM players
+                """, (shard_size,))
+            self.connection.execute("CREATE INDEX temp.player_shards_shard ON player_shards (shard)")
+
+        counts, boundaries = [0] * shard_count, [(None, None)] * shard_count
+        for shard, count, first_id, last_id in self.connection.execute("""
+            SELECT shard, COUNT(*), MIN(CAST(player_id AS INTEGER)), MAX(CAST(player_id AS INTEGER)) FROM player_shards GROUP BY shard
+        """):
+            counts[shard], boundaries[shard] = count, (first_id, last_id)
+        return shard_count, counts, boundaries if mode == "range" else None
+
+    def iter_players(self, shard=None):
+        """(player_id, record) in player database order, shaped like players.json.
+
+        With shard, only the players assign_player_shards() put in that shard.
+        """
+        source, where, parameters = "players p JOIN", "", ()
+        if shard is not None:
+            # CROSS JOIN keeps the shard's players as the outer loop instead of a scan of every transfer
+            source, where, parameters = "player_shards s CROSS JOIN players p CROSS JOIN", "WHERE s.shard = ? AND p.player_id = s.player_id", (shard,)
+        rows = self.connection.execute(f"""
+            SELECT p.player_id, p.name, p.position, p.birth_date, p.display_name, p.country_flags,
+                   {columns("t", TRANSFER_FIELDS)}
+            FROM {source} player_transfers t ON t.player_id = p.player_id
+            {where}
+            ORDER BY t.row
+        """, parameters)
+        for (player_id, name, position, birth_date, display_name, flags), player_rows in groupby(rows, key=lambda row: row[:6]):
+            yield player_id, {
+                "id": player_id,
+                "name": name,
+                "position": position,
+                "birthDate": birth_date,
+                "transfers": [dict(zip(TRANSFER_FIELDS, row[6:])) for row in player_rows],
+                "country_flags": json.loads(flags),
+                "display_name": display_name
+            }
+
+    def iter_name_terms(self):
+        """(term, [(player_id, display_name)]) of every nameIndex.name_terms term in term order, players in database order"""
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS temp.name_terms")
+            self.connection.execute("CREATE TEMP TABLE name_terms (term TEXT NOT NULL, ord INTEGER NOT NULL)")
+            players = self.connection.execute("SELECT ord, display_name FROM players").fetchmany
+            while batch := players(BATCH_SIZE):
+                self.connection.executemany("INSERT INTO name_terms VALUES (?, ?)",
+                                            [(term, ord_) for ord_, display_name in batch for term in name_terms(display_name)])
+            self.connection.execute("CREATE INDEX temp.name_terms_term ON name_terms (term, ord)")
+
+        rows = self.connection.execute("""
+            SELECT n.term, p.player_id, p.display_name
+            FROM name_terms n JOIN players p ON p.ord = n.ord
+            ORDER BY n.term, n.ord
+        """)
+        for term, term_rows in groupby(rows, key=lambda row: row[0]):
+            yield term, [row[1:] for row in term_rows]
+
+    def year_arcs(self, year, coordinates, color, scale):
+        """One year's arcs, in the order of TransferTable.aggregate_arcs.
+
+        coordinates maps each valid country code to (lat, lng); arcs touching
+        any other code are left out.
+        """
+        def members(column, join=""):
+            rows = self.connection.execute(f"""
+                SELECT t.from_country, t.to_country, {column}, MIN(t.row) AS first_row
+                FROM player_transfers t {join}
+                WHERE t.year = ?
+                GROUP BY t.from_country, t.to_country, {column}
+                ORDER BY t.from_country, t.to_country, first_row
+            """, (year,))
+            return {key: [row[2] for row in member_rows] for key, member_rows in groupby(rows, key=lambda row: row[:2])}
+
+        player_ids = members("t.player_id")
+        names = members("p.display_name", "JOIN players p ON p.player_id = t.player_id")
+
+        arcs = []
+        rows = self.connection.execute("""
+            WITH arc_groups AS (
+                SELECT from_country, to_country, MIN(row) AS first_row
+                FROM player_transfers WHERE year = ? GROUP BY from_country, to_country
+            ), origins AS (
+                SELECT from_country, MIN(row) AS origin_first
+                FROM player_transfers WHERE year = ? GROUP BY from_country
+            )
+            SELECT g.from_country, g.to_country
+            FROM arc_groups g JOIN origins o ON o.from_country = g.from_country
+            ORDER BY o.origin_first, g.first_row
+        """, (year, year))
+        for key in rows:
+            origin, destination = key
+            if origin not in coordinates or destination not in coordinates:
+                continue
+            arcs.append({
+                "type": "transfer",
+                "from": origin,
+                "to": destination,
+                "startLat": coordinates[origin][0],
+                "startLong": coordinates[origin][1],
+                "endLat": coordinates[destination][0],
+                "endLong": coordinates[destination][1],
+                "color": color,
+                "scale": scale,
+                "count": len(names[key]),
+                "players": names[key],
+                "player_ids": player_ids[key]
+            })
+        return arcs
+
+    def iter_yearly_arcs(self, coordinates, color, scale):
+        """(year, arcs) of every year with arcs, in year order, one year in memory at a time (see year_arcs)"""
+        years = self.connection.execute("SELECT DISTINCT year FROM player_transfers ORDER BY CAST(year AS INTEGER)").fetchall()
+        for (year,) in years:
+            arcs = self.year_arcs(year, coordinates, color, scale)
+            if arcs:
+                yield str(int(year)), arcs
+
+    def affected_years(self):
+        """createArcs.affected_years between the players before and after the last rebuild(), as a merge of two scans"""
+        previous_order = [player_id for (player_id,) in self.connection.execute("SELECT player_id FROM temp.previous_players ORDER BY ord")]
+        moved = reordered_players(previous_order, self.player_ids())
+
+        def records(players, transfers):
+            rows = self.connection.execute(f"""
+                SELECT p.player_id, p.name, p.position, p.birth_date, p.display_name, p.country_flags, {columns("t", TRANSFER_FIELDS)}
+                FROM {players} p JOIN {transfers} t ON t.player_id = p.player_id
+                ORDER BY p.player_id, t.row
+            """)
+            for key, player_rows in groupby(rows, key=lambda row: row[:6]):
+                yield key[0], (key[1:], [row[6:] for row in player_rows])
+
+        previous = records("temp.previous_players", "temp.previous_player_transfers")
+        current = records("players", "player_transfers")
+        years = set()
+        old, new = next(previous, None), next(current, None)
+        while old or new:
+            if new is None or (old is not None and old[0] < new[0]):
+                changed, old = [old], next(previous, None)
+            elif old is None or new[0] < old[0]:
+                changed, new = [new], next(current, None)
+            else:
+                changed = [old, new] if old[1] != new[1] or new[0] in moved else []
+                old, new = next(previous, None), next(current, None)
+            for _, (_, transfers) in changed:
+                # The year is the first transfer field
+                years.update(transfer[0] for transfer in transfers)
+        return years
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
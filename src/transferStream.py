@@ -0,0 +1,85 @@
+import json
+from collections import namedtuple
+
+try:
+    import ijson
+except ImportError:  # Fall back to loading the whole file
+    ijson = None
+
+# One player moving in or out of a club, or a country header (player_id and player are None)
+# rank orders records the way the sorted seasons used to be walked: (season, club, direction, country, player)
+TransferRecord = namedtuple("TransferRecord", ["rank", "season", "club", "direction", "country_id", "country", "player_id", "player"])
+
+DIRECTIONS = ("teams_in", "teams_out")
+
+
+def iter_clubs(transfer_file_path):
+    """Yield (season_name, club_index, club) for every club in data.seasons, in file order.
+
+    With ijson only one club is materialized at a time; without it the file is
+    loaded whole and walked the same way.
+    """
+    if ijson is None:
+        with open(transfer_file_path, 'r', encoding='utf-8') as f:
+            seasons = json.load(f)["data"]["seasons"]
+        for season_name, clubs in seasons.items():
+            for club_index, club in enumerate(clubs):
+                yield season_name, club_index, club
+        return
+
+    with open(transfer_file_path, 'rb') as f:
+        season_name = None
+        item_prefix = None
+        builder = None
+        depth = 0
+
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                    if depth == 0:
+                        yield season_name, club_index, builder.value
+                        builder = None
+                        club_index += 1
+            elif prefix == "data.seasons" and event == "map_key":
+                season_name = value
+                item_prefix = f"data.seasons.{value}.item"
+                club_index = 0
+            elif prefix == item_prefix and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                depth = 1
+
+
+def iter_player_items(players):
+    """(player_id, player) pairs of a players block, which is either a dict keyed by id or a list"""
+    if isinstance(players, dict):
+        return players.items()
+    if isinstance(players, list):
+        return ((player["id"], player) for player in players if "name" in player and "id" in player)
+    return ()
+
+
+def iter_transfer_records(clubs):
+    """Flatten (season_name, club_index, club) tuples into TransferRecords.
+
+    Every country block yields a header record first (so its flag is seen even
+    without players), then one record per player.
+    """
+    for season_name, club_index, club in clubs:
+        for direction_index, direction in enumerate(DIRECTIONS):
+            country_transfers = club.get(direction, {})
+            if not isinstance(country_transfers, dict):
+                continue
+
+            for country_index, (country_id, transfer_info) in enumerate(country_transfers.items()):
+                rank = (season_name, club_index, direction_index, country_index)
+                yield TransferRecord(rank + (-1,), season_name, club, direction, country_id, transfer_info, None, None)
+
+                if "players" not in transfer_info:
+                    continue
+                for player_index, (player_id, player) in enumerate(iter_player_items(transfer_info["players"])):
+                    yield TransferRecord(rank + (player_index,), season_name, club, direction, country_id, transfer_info, player_id, player)
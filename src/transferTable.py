@@ -0,0 +1,217 @@
+import numpy as np
+
+
+def intern(vocabulary, value):
+    """Integer code of value in vocabulary (a dict value -> code), adding it if new"""
+    code = vocabulary.get(value)
+    if code is None:
+        code = vocabulary[value] = len(vocabulary)
+    return code
+
+
+def first_occurrence_order(group, member, member_count):
+    """Distinct (group, member) pairs, sorted by group and then by first row they appear in.
+
+    Returns (groups, members) arrays of the pairs.
+    """
+    pair_key = group.astype(np.int64) * member_count + member
+    pairs, first_row = np.unique(pair_key, return_index=True)
+    pair_group = pairs // member_count
+    order = np.lexsort((first_row, pair_group))
+    return pair_group[order], (pairs % member_count)[order]
+
+
+def country_coordinates(country_info, country_codes):
+    """Code-indexed coordinate arrays for country_codes: (lat, lng, valid).
+
+    A code takes the coordinates of the first map entry carrying it, and is
+    only valid if that entry exists and has a truthy id.
+    """
+    first_id = {}
+    for country_id, info in country_info.items():
+        first_id.setdefault(info["code"], country_id)
+
+    lat = np.zeros(len(country_codes), dtype=np.float64)
+    lng = np.zeros(len(country_codes), dtype=np.float64)
+    valid = np.zeros(len(country_codes), dtype=bool)
+    for index, code in enumerate(country_codes):
+        country_id = first_id.get(code)
+        if country_id:
+            lat[index] = country_info[country_id]["lat"]
+            lng[index] = country_info[country_id]["lng"]
+            valid[index] = True
+    return lat, lng, valid
+
+
+class TransferTable:
+    """The deduplicated transfers as integer-coded NumPy columns, one row per transfer.
+
+    Rows keep the player database order. Countries, clubs, players and display
+    names are stored once in the string tables and referenced by index.
+    """
+
+    def __init__(self, year, origin, destination, player, from_club, to_club,
+                 country_codes, club_ids, player_ids, player_names, display_names):
+        self.year = year
+        self.origin = origin
+        self.destination = destination
+        self.player = player
+        self.from_club = from_club
+        self.to_club = to_club
+        self.country_codes = country_codes
+        self.club_ids = club_ids
+        self.player_ids = player_ids
+        # player index -> display name index
+        self.player_names = player_names
+        self.display_names = display_names
+
+    def __len__(self):
+        return len(self.year)
+
+    @classmethod
+    def from_player_database(cls, player_database):
+        countries, clubs, names = {}, {}, {}
+        year, origin, destination, player, from_club, to_club = [], [], [], [], [], []
+        player_ids, player_names = [], []
+
+        for player_index, (player_id, player_data) in enumerate(player_database.items()):
+            player_ids.append(player_id)
+            player_names.append(intern(names, player_data["display_name"]))
+            for transfer in player_data["transfers"]:
+                year.append(int(transfer["year"]))
+                origin.append(intern(countries, transfer["from_country"]))
+                destination.append(intern(countries, transfer["to_country"]))
+                player.append(player_index)
+                from_club.append(intern(clubs, transfer["from_club_id"]))
+                to_club.append(intern(clubs, transfer["to_club_id"]))
+
+        return cls(
+            np.array(year, dtype=np.int16),
+            np.array(origin, dtype=np.int32),
+            np.array(destination, dtype=np.int32),
+            np.array(player, dtype=np.int32),
+            np.array(from_club, dtype=np.int32),
+            np.array(to_club, dtype=np.int32),
+            list(countries),
+            list(clubs),
+            player_ids,
+            np.array(player_names, dtype=np.int32),
+            list(names)
+        )
+
+    def aggregate_arcs(self, valid_countries):
+        """Group transfers by (year, origin, destination) into arcs.
+
+        Arcs are ordered by year, then by the first row of their origin within
+        the year, then by their own first row, and pairs whose countries are not
+        in valid_countries are dropped. Returns a dict of columns: "year",
+        "origin", "destination", "count" (distinct display names), plus
+        "player_offsets"/"players" and "name_offsets"/"names" holding each
+        arc's player and display-name indexes in first-seen order.
+        """
+        country_count = max(len(self.country_codes), 1)
+        origin_key = self.year.astype(np.int64) * country_count + self.origin
+        group_key = origin_key * country_count + self.destination
+
+        groups, group_first, row_group = np.unique(group_key, return_index=True, return_inverse=True)
+        _, origin_first, row_origin = np.unique(origin_key, return_index=True, return_inverse=True)
+        group_year = (groups // (country_count * country_count)).astype(np.int16)
+        group_origin = (groups // country_count % country_count).astype(np.int32)
+        group_destination = (groups % country_count).astype(np.int32)
+
+        # Order arcs the way the per-year nested dicts used to, then drop unknown countries
+        group_origin_first = origin_first[row_origin[group_first]]
+        order = np.lexsort((group_first, group_origin_first, group_year))
+        order = order[valid_countries[group_origin[order]] & valid_countries[group_destination[order]]]
+        rank = np.full(len(groups), -1, dtype=np.int64)
+        rank[order] = np.arange(len(order))
+
+        def members_by_arc(member, member_count):
+            pair_group, pair_member = first_occurrence_order(row_group, member, max(member_count, 1))
+            pair_rank = rank[pair_group]
+            keep = pair_rank >= 0
+            pair_rank, pair_member = pair_rank[keep], pair_member[keep]
+            reorder = np.argsort(pair_rank, kind="stable")
+            counts = np.bincount(pair_rank, minlength=len(order))
+            offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+            return offsets, pair_member[reorder].astype(np.int32), counts
+
+        player_offsets, players, _ = members_by_arc(self.player, len(self.player_ids))
+        name_offsets, names, name_counts = members_by_arc(self.player_names[self.player], len(self.display_names))
+
+        return {
+            "year": group_year[order],
+            "origin": group_origin[order],
+            "destination": group_destination[order],
+            "count": name_counts.astype(np.int32),
+            "player_offsets": player_offsets,
+            "players": players,
+            "name_offsets": name_offsets,
+            "names": names
+        }
+
+
+class YearlyArcColumns:
+    """Arc columns shaped like TransferTable.aggregate_arcs, assembled one year at a time.
+
+    set_year() takes the arc dicts of a lines_{year}.json file and replaces
+    whatever the year held, so arcs can be gathered from per-year queries or
+    updated a year at a time. The country, player and display name strings
+    are interned as they come (after any seeded codes, which fix their
+    order), and the object stands in for the table argument of the packed,
+    flow and index encoders.
+    """
+
+    def __init__(self, country_codes=(), player_ids=()):
+        self.country_codes, self.countries = [], {}
+        self.player_ids, self.players = [], {}
+        self.display_names, self.names = [], {}
+        for code in country_codes:
+            self.code(self.countries, self.country_codes, code)
+        for player_id in player_ids:
+            self.code(self.players, self.player_ids, player_id)
+        self.years = {}
+
+    @staticmethod
+    def code(vocabulary, values, value):
+        code = vocabulary.get(value)
+        if code is None:
+            code = vocabulary[value] = len(values)
+            values.append(value)
+        return code
+
+    def set_year(self, year, arcs):
+        if not arcs:
+            self.years.pop(int(year), None)
+            return
+        self.years[int(year)] = {
+            "origin": np.array([self.code(self.countries, self.country_codes, arc["from"]) for arc in arcs], dtype=np.int32),
+            "destination": np.array([self.code(self.countries, self.country_codes, arc["to"]) for arc in arcs], dtype=np.int32),
+            "count": np.array([arc["count"] for arc in arcs], dtype=np.int32),
+            "player_counts": np.array([len(arc["player_ids"]) for arc in arcs], dtype=np.int64),
+            "players": np.array([self.code(self.players, self.player_ids, p) for arc in arcs for p in arc["player_ids"]], dtype=np.int32),
+            "name_counts": np.array([len(arc["players"]) for arc in arcs], dtype=np.int64),
+            "names": np.array([self.code(self.names, self.display_names, n) for arc in arcs for n in arc["players"]], dtype=np.int32)
+        }
+
+    def columns(self):
+        """The arcs of every year as aggregate_arcs columns, in year order"""
+        years = sorted(self.years)
+        chunks = [self.years[year] for year in years]
+
+        def joined(name, dtype):
+            return np.concatenate([chunk[name] for chunk in chunks]).astype(dtype) if chunks else np.zeros(0, dtype=dtype)
+
+        def offsets(name):
+            return np.concatenate(([0], np.cumsum(joined(name, np.int64)))).astype(np.int64)
+
+        return {
+            "year": np.repeat(np.array(years, dtype=np.int16), [len(chunk["count"]) for chunk in chunks]),
+            "origin": joined("origin", np.int32),
+            "destination": joined("destination", np.int32),
+            "count": joined("count", np.int32),
+            "player_offsets": offsets("player_counts"),
+            "players": joined("players", np.int32),
+            "name_offsets": offsets("name_counts"),
+            "names": joined("names", np.int32)
+        }
@@ -0,0 +1,543 @@
+import bisect
+import json
+import os
+import time
+from collections import defaultdict
+
+from createArcs import (arc_color, arc_scale, arc_tiers_folder_path, arc_indexes_path, assign_display_names, build_parser,
+                        build_state_version, changed_years, dedupe_player_transfers, flow_tables_path, list_transfer_files,
+                        load_country_info, map_file_path, name_index_folder_path, output_options, packed_arcs_path,
+                        player_db_path, process_transfer_file, queue_arc_outputs, queue_year_files, remove_stale_files,
+                        report_outputs, save_build_state, transfers_folder_path, year_range)
+from countryFlags import player_country_flags
+from emitOutputs import Emitter, emit_stream
+from fetchTransfers import hash_file, update_transfer_files
+from nameIndex import encode_name_index
+from pipelineStats import PipelineStats
+from playerShards import (index_filename as player_index_filename, player_file_chunks, player_fragment, player_shards_folder_path,
+                          shard_assignment, shard_filename, shard_index)
+from transferTable import YearlyArcColumns, country_coordinates
+
+# Long-running refresh: keeps every normalized record in memory and applies only what changed
+DEFAULT_INTERVAL = 300
+
+
+class SeasonRecords:
+    """Stands in for a TransferIngest and collects one file's records as hashable tuples, per season"""
+
+    def __init__(self):
+        self.seasons = defaultdict(set)
+        self.records_parsed = 0
+
+    def add_flag(self, code, logo_url, rank):
+        self.seasons[rank[1]].add(("flag", rank, code, logo_url))
+
+    def add_transfer(self, player_id, player, year, from_country, to_country,
+                     from_club_id, from_club_name, to_club_id, to_club_name, rank):
+        self.seasons[rank[1]].add(("transfer", rank, player_id, player["name"], player.get("posicao", "Unknown"),
+                                   player.get("dt_nascimento", "Unknown"), year, from_country, to_country,
+                                   from_club_id, from_club_name, to_club_id, to_club_name))
+
+
+class DeltaIngest:
+    """Player database maintained by adding and removing individual records.
+
+    Every candidate record is kept, not only the lowest-ranked one, so a
+    removal can promote the next candidate. The winners follow the same rules
+    as TransferIngest: lowest rank per transfer key, per player and per flag.
+    Only players touched by a change (or using a country whose flag changed)
+    are rebuilt, deduplicated and renamed. The database order is kept as a
+    sorted list of (rank, player id), and year_players lists the players
+    with a transfer in each year, so one year's arcs can be rebuilt alone.
+    """
+
+    def __init__(self, country_info, folder_path=transfers_folder_path):
+        self.country_info = country_info
+        self.folder_path = folder_path
+        # filename -> {"index", "md5", "stat", "seasons": season index, "records": {season: set of records}}
+        self.files = {}
+        # transfer key -> {rank: transfer}
+        self.key_candidates = {}
+        # player_id -> {rank: (name, position, birth date)}
+        self.player_candidates = {}
+        # country code -> {rank: flag URL}
+        self.flag_candidates = {}
+        self.player_keys = defaultdict(set)
+        self.country_players = defaultdict(set)
+        self.name_players = defaultdict(set)
+        self.player_rank = {}
+        self.player_database = {}
+        self.order = []
+        self.year_players = defaultdict(set)
+        self.touched_players = set()
+        self.touched_flags = set()
+        # country code -> (rank, flag URL) the current records were built with
+        self.country_flags = {}
+
+    def apply(self, record, add):
+        """Add or remove one record tuple of SeasonRecords"""
+        if record[0] == "flag":
+            _, rank, code, logo_url = record
+            candidates = self.flag_candidates.setdefault(code, {})
+            if add:
+                candidates[rank] = logo_url
+            else:
+                del candidates[rank]
+                if not candidates:
+                    del self.flag_candidates[code]
+            self.touched_flags.add(code)
+            return
+
+        (_, rank, player_id, name, position, birth_date, year, from_country, to_country,
+         from_club_id, from_club_name, to_club_id, to_club_name) = record
+        transfer_key = (player_id, year, from_country, to_country, from_club_id, to_club_id)
+        key_candidates = self.key_candidates.setdefault(transfer_key, {})
+        player_candidates = self.player_candidates.setdefault(player_id, {})
+        if add:
+            key_candidates[rank] = {
+                "year": year,
+                "from_country": from_country,
+                "to_country": to_country,
+                "from_club_id": from_club_id,
+                "from_club_name": from_club_name,
+                "to_club_id": to_club_id,
+                "to_club_name": to_club_name
+            }
+            player_candidates[rank] = (name, position, birth_date)
+            self.player_keys[player_id].add(transfer_key)
+            self.country_players[from_country].add(player_id)
+            self.country_players[to_country].add(player_id)
+        else:
+            del key_candidates[rank]
+            del player_candidates[rank]
+            if not key_candidates:
+                del self.key_candidates[transfer_key]
+                self.player_keys[player_id].discard(transfer_key)
+            if not player_candidates:
+                del self.player_candidates[player_id]
+                del self.player_keys[player_id]
+        self.touched_players.add(player_id)
+
+    def update_file(self, filename, file_index, file_md5, stat):
+        """Re-read one file and apply the records of its changed seasons. Returns (added, removed)"""
+        records = SeasonRecords()
+        season_index = {}
+        process_transfer_file(os.path.join(self.folder_path, filename), file_index, self.country_info, records, season_index, verbose=False)
+
+        previous = self.files.get(filename, {"seasons": {}, "records": {}})
+        added = removed = 0
+        for season_name in set(previous["records"]) | set(records.seasons) | set(previous["seasons"]) | set(season_index):
+            if season_name in previous["seasons"] and previous["seasons"][season_name] == season_index.get(season_name):
+                continue
+            old = previous["records"].get(season_name, set())
+            new = records.seasons.get(season_name, set())
+            for record in old - new:
+                self.apply(record, False)
+            for record in new - old:
+                self.apply(record, True)
+            added += len(new - old)
+            removed += len(old - new)
+
+        self.files[filename] = {"index": file_index, "md5": file_md5, "stat": stat, "seasons": season_index, "records": dict(records.seasons)}
+        return added, removed
+
+    def refresh(self):
+        """Apply every changed competition file.
+
+        Returns (names of the files that changed, whether everything was reloaded).
+        """
+        transfer_files = list_transfer_files(self.folder_path)
+        reloaded = sorted(self.files) != transfer_files and bool(self.files)
+        if reloaded:
+            # File positions are part of every rank: start over when the set of files changes
+            print("🔁 The set of competition files changed, reloading all of them.")
+            self.__init__(self.country_info, self.folder_path)
+
+        changed = []
+        for file_index, filename in enumerate(transfer_files):
+            file_stat = os.stat(os.path.join(self.folder_path, filename))
+            stat = (file_stat.st_mtime_ns, file_stat.st_size)
+            if filename in self.files and self.files[filename]["stat"] == stat:
+                continue
+            file_md5 = hash_file(os.path.join(self.folder_path, filename))
+            if filename in self.files and self.files[filename]["md5"] == file_md5:
+                self.files[filename]["stat"] = stat
+                continue
+            added, removed = self.update_file(filename, file_index, file_md5, stat)
+            print(f"🔁 {filename}: {added} record(s) added, {removed} removed")
+            changed.append(filename)
+        return changed, reloaded
+
+    def player_record(self, player_id, country_flags):
+        """Rebuild one player's record from the winning candidates (before dedup and display names)"""
+        transfers = sorted(min(self.key_candidates[key].items()) for key in self.player_keys[player_id])
+        rank, (name, position, birth_date) = min(self.player_candidates[player_id].items())
+        self.player_rank[player_id] = rank
+
+        player_flags = player_country_flags([(rank, t["from_country"], t["to_country"]) for rank, t in transfers], country_flags)
+
+        return {
+            "id": player_id,
+            "name": name,
+            "position": position,
+            "birthDate": birth_date,
+            "transfers": [dict(transfer) for _, transfer in transfers],
+            "country_flags": player_flags
+        }
+
+    def ordered_players(self):
+        """{player_id: record} in database (first-seen) order"""
+        return {player_id: self.player_database[player_id] for _, player_id in self.order}
+
+    def rebuild_players(self):
+        """Bring player_database up to date with the applied records.
+
+        Returns (years whose arcs may have changed, players whose record or position changed).
+        """
+        # A country's players only need a rebuild when the flag that wins for it changed
+        country_flags = {code: min(candidates.items()) for code, candidates in self.flag_candidates.items()}
+        affected = set(self.touched_players)
+        for code in self.touched_flags:
+            if country_flags.get(code) != self.country_flags.get(code):
+                affected |= self.country_players[code]
+        if not affected:
+            self.touched_flags, self.country_flags = set(), country_flags
+            return set(), set()
+
+        # Players sharing a name with an affected player may change display name
+        names = {self.player_database[p]["name"] for p in affected if p in self.player_database}
+        names |= {min(self.player_candidates[p].items())[1][0] for p in affected if p in self.player_candidates}
+        previous = {}
+        for name in names:
+            for player_id in self.name_players[name]:
+                previous[player_id] = dict(self.player_database[player_id])
+        previous.update({p: self.player_database[p] for p in affected if p in self.player_database})
+        previous_rank = {p: self.player_rank[p] for p in previous}
+
+        for player_id in affected:
+            if player_id in self.player_database:
+                self.remove_player(player_id)
+            if player_id in self.player_candidates:
+                record = self.player_record(player_id, country_flags)
+                dedupe_player_transfers({player_id: record})
+                self.add_player(player_id, record)
+
+        # Redo the names of the affected groups, in first-seen order
+        for name in names:
+            group = sorted(self.name_players[name], key=self.player_rank.__getitem__)
+            if group:
+                assign_display_names({p: self.player_database[p] for p in group})
+
+        self.touched_players, self.touched_flags, self.country_flags = set(), set(), country_flags
+
+        # Flag order shows in players.json, and dict equality ignores it
+        def written_form(record, rank):
+            return record and (record, list(record["country_flags"]), rank)
+
+        changed = {p for p in set(previous) | affected
+                   if written_form(previous.get(p), previous_rank.get(p)) != written_form(self.player_database.get(p), self.player_rank.get(p))}
+        years = set()
+        for player_id in changed:
+            for record in (previous.get(player_id), self.player_database.get(player_id)):
+                if record:
+                    years.update(transfer["year"] for transfer in record["transfers"])
+        return years, changed
+
+    def remove_player(self, player_id):
+        record = self.player_database.pop(player_id)
+        rank = self.player_rank.pop(player_id)
+        self.name_players[record["name"]].discard(player_id)
+        del self.order[bisect.bisect_left(self.order, (rank, player_id))]
+        for transfer in record["transfers"]:
+            self.year_players[str(int(transfer["year"]))].discard(player_id)
+
+    def add_player(self, player_id, record):
+        """Insert a record built by player_record (which set the player's rank)"""
+        self.player_database[player_id] = record
+        self.name_players[record["name"]].add(player_id)
+        bisect.insort(self.order, (self.player_rank[player_id], player_id))
+        for transfer in record["transfers"]:
+            self.year_players[str(int(transfer["year"]))].add(player_id)
+
+    def inputs(self):
+        """Per-file md5 and season index, as stored in the build state"""
+        return {f: {"md5": entry["md5"], "seasons": entry["seasons"]} for f, entry in sorted(self.files.items())}
+
+
+def year_arcs(players, year, coordinates):
+    """One year's arcs of lines_{year}.json, from the (player_id, record) pairs with a transfer that year in database order.
+
+    The nested dicts give the order of TransferTable.aggregate_arcs: origins
+    by their first transfer, their destinations by first transfer, and
+    members in first-seen order. Arcs touching a country without
+    coordinates are left out.
+    """
+    origins = {}
+    for player_id, record in players:
+        for transfer in record["transfers"]:
+            if str(int(transfer["year"])) == year:
+                player_ids, names = origins.setdefault(transfer["from_country"], {}).setdefault(transfer["to_country"], ({}, {}))
+                player_ids[player_id] = None
+                names[record["display_name"]] = None
+
+    arcs = []
+    for origin, destinations in origins.items():
+        for destination, (player_ids, names) in destinations.items():
+            if origin not in coordinates or destination not in coordinates:
+                continue
+            arcs.append({
+                "type": "transfer",
+                "from": origin,
+                "to": destination,
+                "startLat": coordinates[origin][0],
+                "startLong": coordinates[origin][1],
+                "endLat": coordinates[destination][0],
+                "endLong": coordinates[destination][1],
+                "color": arc_color,
+                "scale": arc_scale,
+                "count": len(names),
+                "players": list(names),
+                "player_ids": list(player_ids)
+            })
+    return arcs
+
+
+class WarmOutputs:
+    """The generated files of a DeltaIngest, kept warm between polls so a refresh only redoes what changed.
+
+    Each player's players.json entry, each year's arcs and their columns are
+    cached. A refresh re-encodes the entries of the changed players, the
+    shards holding them, the arcs of the dirty years, the name index when a
+    display name changed, and the packed, flow and index files only when
+    some year's arcs (or, for the flows, arc counts) changed. After the
+    first build those three files may list countries and players in
+    another order than a full build, with the same content.
+    """
+
+    def __init__(self, args, country_info):
+        self.args = args
+        self.country_info = country_info
+        self.indent = None if args.minify else 4
+        codes = list(dict.fromkeys(info["code"] for info in country_info.values()))
+        lat, lng, valid = country_coordinates(country_info, codes)
+        self.coordinates = {code: (float(lat[i]), float(lng[i])) for i, code in enumerate(codes) if valid[i]}
+        self.reset()
+
+    def reset(self):
+        self.fragments = {}
+        # player_id -> (display name, rank) the name index was built with
+        self.display_names = {}
+        # shard -> player ids in database order, as last written
+        self.shards = []
+        self.shard_of = {}
+        self.boundaries = None
+        self.name_files = []
+        self.yearly_arcs = {}
+        self.year_files = {}
+        self.arc_table = None
+
+    def shard_paths(self):
+        return [shard_filename(shard) for shard in range(len(self.shards))] + [player_index_filename]
+
+    def update_shards(self, delta, players, emitter):
+        """Queue the player shards whose players changed. Returns the shard filenames"""
+        args = self.args
+        membership_changed = any((p in delta.player_database) != (p in self.shard_of) for p in players) or not self.shards
+        if membership_changed:
+            # New or removed players move the range boundaries (or the hash modulus): reassign, then compare shard by shard
+            shard_count, self.shard_of, boundaries = shard_assignment(delta.player_database, args.player_shard_size, args.player_shard_mode)
+            members = [[] for _ in range(shard_count)]
+            for _, player_id in delta.order:
+                members[self.shard_of[player_id]].append(player_id)
+            dirty = {shard for shard in range(shard_count) if shard >= len(self.shards) or members[shard] != self.shards[shard]}
+            dirty.update(self.shard_of[p] for p in players if p in self.shard_of)
+            self.shards, self.boundaries = members, boundaries
+        else:
+            # Same players in the same shards: only the order inside a shard can move
+            dirty = {self.shard_of[p] for p in players}
+            for shard in dirty:
+                self.shards[shard].sort(key=delta.player_rank.__getitem__)
+
+        os.makedirs(player_shards_folder_path, exist_ok=True)
+        for shard in sorted(dirty):
+            chunks = player_file_chunks((self.fragments[p] for p in self.shards[shard]), self.indent)
+            emitter.submit(os.path.join(player_shards_folder_path, shard_filename(shard)), "".join(chunks))
+        if dirty or membership_changed:
+            index = shard_index(args.player_shard_mode, args.player_shard_size, [len(members) for members in self.shards], self.boundaries)
+            separators = (",", ":") if args.minify else None
+            emitter.submit(os.path.join(player_shards_folder_path, player_index_filename),
+                           json.dumps(index, indent=self.indent, separators=separators))
+            remove_stale_files(player_shards_folder_path, "players_", {path for filename in self.shard_paths() for path in emitter.paths(filename)})
+        return self.shard_paths()
+
+    def update(self, delta, years, players, full, stats):
+        """Write what the changed years and players affect (everything when full). Returns the output paths"""
+        args = self.args
+        emitter = Emitter(args.minify, args.compress, args.emit_workers)
+        written = {}
+        if full:
+            self.reset()
+            players = set(delta.player_database)
+            years = set(delta.year_players)
+        years = {str(int(year)) for year in years}
+
+        with stats.stage("players"):
+            for player_id in players:
+                if player_id in delta.player_database:
+                    self.fragments[player_id] = player_fragment(player_id, delta.player_database[player_id], self.indent)
+                else:
+                    self.fragments.pop(player_id, None)
+            if args.player_format != "sharded" and (players or not os.path.exists(player_db_path)):
+                fragments = (self.fragments[player_id] for _, player_id in delta.order)
+                written[player_db_path] = emit_stream(player_db_path, player_file_chunks(fragments, self.indent), args.compress)
+            shard_files = self.update_shards(delta, players, emitter) if args.player_format != "monolithic" else []
+
+        # The name index depends on every display name (and the database order), so it is only redone when one changed
+        display_names = {p: (delta.player_database[p]["display_name"], delta.player_rank[p]) for p in players if p in delta.player_database}
+        if full or any(self.display_names.get(p) != display_names.get(p) for p in players):
+            with stats.stage("name_index"):
+                for player_id in players:
+                    if player_id in display_names:
+                        self.display_names[player_id] = display_names[player_id]
+                    else:
+                        self.display_names.pop(player_id, None)
+                os.makedirs(name_index_folder_path, exist_ok=True)
+                name_files = encode_name_index(delta.ordered_players())
+                for filename, data in name_files.items():
+                    emitter.submit(os.path.join(name_index_folder_path, filename), data)
+                self.name_files = list(name_files)
+                remove_stale_files(name_index_folder_path, "names_", {path for filename in name_files for path in emitter.paths(filename)})
+
+        # Rebuild the arcs of the dirty years only, and rewrite the files of those that changed
+        year_arc_counts = {}
+        arcs_changed = flows_changed = full
+        with stats.stage("arcs"):
+            if self.arc_table is None:
+                # Seeded like a TransferTable, so the first build matches createArcs byte for byte
+                country_codes = dict.fromkeys(code for _, player_id in delta.order for transfer in delta.player_database[player_id]["transfers"]
+                                              for code in (transfer["from_country"], transfer["to_country"]))
+                self.arc_table = YearlyArcColumns(country_codes, [player_id for _, player_id in delta.order])
+            if args.arc_tiers:
+                os.makedirs(arc_tiers_folder_path, exist_ok=True)
+            for year in sorted(years, key=int):
+                members = sorted(delta.year_players.get(year, ()), key=delta.player_rank.__getitem__)
+                arcs = year_arcs(((p, delta.player_database[p]) for p in members), year, self.coordinates)
+                previous = self.yearly_arcs.get(year, [])
+                if arcs == previous and not full:
+                    continue
+                arcs_changed = True
+                flows_changed |= [(a["from"], a["to"], a["count"]) for a in arcs] != [(a["from"], a["to"], a["count"]) for a in previous]
+                self.arc_table.set_year(year, arcs)
+                if arcs:
+                    self.yearly_arcs[year] = arcs
+                else:
+                    self.yearly_arcs.pop(year, None)
+                if arcs and year_range[0] <= int(year) <= year_range[1]:
+                    arc_counts, self.year_files[year] = queue_year_files(args, emitter, year, arcs, None)
+                    year_arc_counts.update(arc_counts)
+                else:
+                    self.year_files.pop(year, None)
+        stats.count("arcs", sum(len(arcs) for arcs in self.yearly_arcs.values()))
+
+        if arcs_changed:
+            arc_columns = self.arc_table.columns()
+            coordinates = country_coordinates(self.country_info, self.arc_table.country_codes)
+            queue_arc_outputs(args, emitter, self.arc_table, arc_columns, coordinates, stats, flows=flows_changed)
+
+        with stats.stage("emit"):
+            written.update(emitter.run())
+        report_outputs(args, written, len(delta.player_database), shard_files, self.name_files, year_arc_counts, stats)
+
+        outputs = [player_db_path] if args.player_format != "sharded" else []
+        outputs += [os.path.join(player_shards_folder_path, filename) for filename in shard_files]
+        outputs += [os.path.join(name_index_folder_path, filename) for filename in self.name_files]
+        outputs += [path for files in self.year_files.values() for path in files]
+        outputs += [flow_tables_path, arc_indexes_path] + ([packed_arcs_path] if args.arc_format != "json" else [])
+        return [path for output in outputs for path in emitter.paths(output)]
+
+
+def refresh_outputs(args, delta, warm, pending, stats):
+    """One poll: fetch, apply changed files and rewrite the affected outputs.
+
+    pending carries what still has to be written ("full" rebuild, dirty
+    "years" and "players", unsaved "changes") until a refresh succeeds, so a
+    failed tick is retried in full on the next one. Returns the number of
+    changed files.
+    """
+    if not args.skip_fetch:
+        with stats.stage("fetch"):
+            update_transfer_files(transfers_folder_path, workers=args.fetch_workers, base_url=args.api_base_url)
+
+    previous_inputs = delta.inputs()
+    with stats.stage("apply_changes"):
+        changed, reloaded = delta.refresh()
+    pending["full"] |= reloaded
+    pending["years"] |= changed_years(previous_inputs, delta.inputs())
+    pending["changes"] += len(changed)
+    if not (pending["changes"] or pending["full"]):
+        return 0
+
+    with stats.stage("rebuild_players"):
+        years, players = delta.rebuild_players()
+    pending["years"] |= years
+    pending["players"] |= players
+    if not pending["full"]:
+        print(f"🔎 {len(pending['years'])} year(s) and {len(pending['players'])} player(s) affected: "
+              f"{', '.join(sorted(pending['years'])) or 'none'}")
+    try:
+        outputs = warm.update(delta, pending["years"], pending["players"], pending["full"], stats)
+    except Exception:
+        # The warm copies may be ahead of the files on disk now: rebuild everything on the next try
+        pending["full"] = True
+        raise
+    save_build_state({
+        "version": build_state_version,
+        "map_md5": hash_file(map_file_path),
+        "options": output_options(args),
+        "players": [player_id for _, player_id in delta.order],
+        "inputs": delta.inputs(),
+        "outputs": sorted(outputs)
+    })
+    changes = pending["changes"]
+    pending.update(full=False, years=set(), players=set(), changes=0)
+    return changes
+
+
+def watch(args):
+    """Build once, then poll for changed competitions every args.interval seconds.
+
+    A failing tick (a half-written transfer file, a fetch error, ...) is
+    logged and retried on the next poll instead of stopping the watcher.
+    """
+    delta = DeltaIngest(load_country_info())
+    warm = WarmOutputs(args, delta.country_info)
+    pending = {"full": True, "years": set(), "players": set(), "changes": 0}
+
+    while True:
+        stats = PipelineStats()
+        started = time.perf_counter()
+        try:
+            changed = refresh_outputs(args, delta, warm, pending, stats)
+        except Exception as e:
+            if args.once:
+                raise
+            print(f"❌ Refresh failed, retrying in {args.interval:g}s: {type(e).__name__}: {' '.join(str(e).split())}")
+        else:
+            if changed:
+                print(f"✅ Refreshed {changed} file(s) in {time.perf_counter() - started:.2f}s")
+                if args.report:
+                    stats.write(args.report)
+
+        if args.once:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    parser = build_parser("Keep the arc files up to date, applying only the transfers that changed.")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="Seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Run a single refresh and exit")
+    try:
+        watch(parser.parse_args())
+    except KeyboardInterrupt:
+        print("👋 Stopped watching.")
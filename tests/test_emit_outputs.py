@@ -0,0 +1,31 @@
+import os
+import stat
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from emitOutputs import UMASK, emit_file, emit_stream  # noqa: E402
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_files_get_the_umask_mode(tmp_path):
+    path = str(tmp_path / "lines_2019.json")
+    emit_file(path, {"arcs": []}, compress=True)
+    emit_stream(str(tmp_path / "players.json"), ['{"players": {}}'], compress=True)
+    for name in ("lines_2019.json", "lines_2019.json.gz", "players.json", "players.json.gz"):
+        assert mode(tmp_path / name) == 0o666 & ~UMASK
+
+
+def test_rewritten_files_keep_their_mode(tmp_path):
+    path = tmp_path / "lines_2019.json"
+    path.write_text("{}")
+    os.chmod(path, 0o644)
+    assert emit_file(str(path), {"arcs": [1]})
+    assert mode(path) == 0o644
+
+    os.chmod(path, 0o640)
+    assert emit_stream(str(path), ['{"arcs": [2]}'])
+    assert mode(path) == 0o640
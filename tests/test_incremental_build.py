@@ -0,0 +1,98 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import createArcs  # noqa: E402
+
+MAP = {"type": "Map", "coordinates": [
+    {"id": 1, "text": "POR", "size": 1.0, "country": "Portugal", "lat": 39.5, "lng": -8.25},
+    {"id": 2, "text": "ESP", "size": 1.0, "country": "Espanha", "lat": 40.4, "lng": -3.7},
+]}
+
+
+def player(name, club_id, club_name):
+    return {"name": name, "posicao": "Médio", "dt_nascimento": "1990-01-01", "club_id": club_id, "club_descr": club_name}
+
+
+def club(club_id, name, direction, country_id, players, logo=""):
+    return {"id": club_id, "name": name, direction: {str(country_id): {"logo": logo, "name": "", "players": players}}}
+
+
+def transfer_file(seasons):
+    return {"error_code": "0", "error_text": "", "data": {"Name": "Liga", "seasons": seasons}}
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def run(*argv):
+    createArcs.main(["--skip-fetch", "--emit-workers", "1", *argv])
+
+
+def read_arcs(year):
+    with open(os.path.join(createArcs.output_folder_path, f"lines_{year}.json"), 'r', encoding='utf-8') as f:
+        return json.load(f)["arcs"]
+
+
+@pytest.mark.parametrize("options", [(), ("--player-format", "sharded"), ("--store", os.path.join(".cache", "transfers.sqlite"))])
+def test_incremental_build_follows_player_order(tmp_path, monkeypatch, options):
+    monkeypatch.chdir(tmp_path)
+    write_json(createArcs.map_file_path, MAP)
+    os.makedirs(createArcs.output_folder_path)
+    transfers = os.path.join(createArcs.transfers_folder_path, "transfers_{}.json")
+
+    # Alpha and Beta move from Sevilha to Porto in 2019 and again in 2021
+    arrivals = {"1": player("Alpha", "20", "Sevilha"), "2": player("Beta", "20", "Sevilha")}
+    write_json(transfers.format("POR"), transfer_file({
+        f"Liga {year}": [club("10", "Porto", "teams_in", 2, arrivals)] for year in (2019, 2021)
+    }))
+    run(*options)
+    assert read_arcs(2021)[0]["players"] == ["Alpha", "Beta"]
+
+    # An exact duplicate of Beta's 2019 move in an earlier file ranks Beta first without changing his record
+    write_json(transfers.format("ESP"), transfer_file({
+        "Liga 2019": [club("20", "Sevilha", "teams_out", 1, {"2": player("Beta", "10", "Porto")})]
+    }))
+    run(*options)
+    incremental = {year: read_arcs(year) for year in (2019, 2021)}
+    assert incremental[2021][0]["players"] == ["Beta", "Alpha"]
+
+    run("--force", *options)
+    assert {year: read_arcs(year) for year in (2019, 2021)} == incremental
+
+
+
+def test_sharded_build_ignores_a_stale_players_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_json(createArcs.map_file_path, MAP)
+    os.makedirs(createArcs.output_folder_path)
+    transfers = os.path.join(createArcs.transfers_folder_path, "transfers_{}.json")
+    write_json(transfers.format("POR"), transfer_file({
+        "Liga 2021": [club("10", "Porto", "teams_in", 2, {"1": player("Alpha", "20", "Sevilha")})]
+    }))
+
+    # The earlier file names the player, so renaming the player there changes the 2021 arc too
+    def write_spanish_name(name):
+        write_json(transfers.format("ESP"), transfer_file({
+            "Liga 2019": [club("20", "Sevilha", "teams_in", 1, {"1": player(name, "10", "Porto")})]
+        }))
+
+    # A monolithic run leaves players.json behind, then the build switches to shards
+    write_spanish_name("Alpha")
+    run()
+    run("--player-format", "sharded")
+
+    # Renamed and renamed back: the second change is only visible against the shards
+    write_spanish_name("Alfa")
+    run("--player-format", "sharded")
+    assert read_arcs(2021)[0]["players"] == ["Alfa"]
+    write_spanish_name("Alpha")
+    run("--player-format", "sharded")
+    assert read_arcs(2021)[0]["players"] == ["Alpha"]
@@ -0,0 +1,84 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from createArcs import arc_color, arc_scale, build_yearly_arcs  # noqa: E402
+from packedArcs import PackedArcs, encode_packed_arcs  # noqa: E402
+from transferTable import TransferTable, country_coordinates  # noqa: E402
+
+COUNTRY_INFO = {
+    1: {"code": "POR", "lat": 39.5, "lng": -8.25},
+    2: {"code": "ESP", "lat": 40.4, "lng": -3.7},
+    3: {"code": "BRA", "lat": -14.235, "lng": -51.9253},
+    4: {"code": "JPN", "lat": 36.2048, "lng": 138.2529},
+}
+
+
+def transfer(year, from_country, to_country, from_club, to_club):
+    return {
+        "year": str(year), "from_country": from_country, "to_country": to_country,
+        "from_club_id": from_club, "from_club_name": f"Club {from_club}",
+        "to_club_id": to_club, "to_club_name": f"Club {to_club}"
+    }
+
+
+def player(player_id, display_name, *transfers):
+    return {"id": player_id, "name": display_name.split(" (")[0], "display_name": display_name, "transfers": list(transfers)}
+
+
+PLAYER_DATABASE = {
+    "10": player("10", "João Félix", transfer(2019, "POR", "ESP", "1", "2"), transfer(2023, "ESP", "POR", "2", "1")),
+    "11": player("11", "Pedro (1990)", transfer(2019, "POR", "ESP", "3", "2"), transfer(2021, "BRA", "POR", "4", "3")),
+    "12": player("12", "Pedro (1995)", transfer(2019, "POR", "ESP", "3", "5")),
+    "13": player("13", "Keisuke Honda", transfer(2021, "JPN", "BRA", "6", "4"), transfer(1949, "JPN", "POR", "6", "1")),
+    # XXX is not on the map, so its arcs are dropped from both formats
+    "14": player("14", "Nobody", transfer(2021, "XXX", "POR", "7", "1"), transfer(2019, "BRA", "POR", "4", "1")),
+}
+
+
+def encode_both(tmp_path, player_database):
+    table = TransferTable.from_player_database(player_database)
+    coordinates = country_coordinates(COUNTRY_INFO, table.country_codes)
+    arc_columns = table.aggregate_arcs(coordinates[2])
+    path = tmp_path / "lines.bin"
+    path.write_bytes(encode_packed_arcs(table, arc_columns, coordinates, arc_color, arc_scale, (1950, 2025)))
+    return build_yearly_arcs(table, arc_columns, coordinates), path
+
+
+def test_packed_arcs_round_trip_every_year(tmp_path):
+    yearly_arcs, path = encode_both(tmp_path, PLAYER_DATABASE)
+    with PackedArcs(str(path)) as packed:
+        assert packed.years() == ["2019", "2021", "2023"]
+        for year in packed.years():
+            assert packed.arcs(year) == yearly_arcs[year]
+        assert packed.arcs("1949") == []
+
+
+def test_packed_arcs_keep_shared_names_and_order(tmp_path):
+    yearly_arcs, path = encode_both(tmp_path, PLAYER_DATABASE)
+    with PackedArcs(str(path)) as packed:
+        arcs = packed.arcs("2019")
+    por_esp = arcs[0]
+    assert (por_esp["from"], por_esp["to"], por_esp["count"]) == ("POR", "ESP", 3)
+    assert por_esp["players"] == ["João Félix", "Pedro (1990)", "Pedro (1995)"]
+    assert por_esp["player_ids"] == ["10", "11", "12"]
+    assert arcs == yearly_arcs["2019"]
+
+
+def test_packed_arcs_random_database(tmp_path):
+    rng = np.random.default_rng(7)
+    codes = ["POR", "ESP", "BRA", "JPN"]
+    player_database = {}
+    for index in range(200):
+        transfers = [transfer(int(rng.integers(1990, 2000)), codes[rng.integers(4)], codes[rng.integers(4)],
+                              str(rng.integers(20)), str(rng.integers(20))) for _ in range(int(rng.integers(1, 4)))]
+        player_database[str(index)] = player(str(index), f"Player {index % 150}", *transfers)
+
+    yearly_arcs, path = encode_both(tmp_path, player_database)
+    with PackedArcs(str(path)) as packed:
+        assert sorted(packed.years()) == sorted(yearly_arcs)
+        for year in packed.years():
+            assert packed.arcs(year) == yearly_arcs[year]